@@ -0,0 +1,35 @@
+"""widening channel in notification_outbox
+
+Revision ID: 52b619eb7a8a
+Revises: c47d0e5a9f21
+Create Date: 2026-10-19 14:05:51.630284
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '52b619eb7a8a'
+down_revision: Union[str, Sequence[str], None] = 'c47d0e5a9f21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # location:<location>:feed channels run to 114 characters (locations are String(100))
+    op.alter_column('notification_outbox', 'channel',
+               existing_type=sa.String(length=100),
+               type_=sa.String(length=255),
+               existing_nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column('notification_outbox', 'channel',
+               existing_type=sa.String(length=255),
+               type_=sa.String(length=100),
+               existing_nullable=False)
@@ -0,0 +1,34 @@
+"""adding cuisine_seq column in restaurants
+
+Revision ID: 9b2e41d07c3a
+Revises: 6a1c3f162bb8
+Create Date: 2026-10-19 10:12:41.517203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b2e41d07c3a'
+down_revision: Union[str, Sequence[str], None] = '6a1c3f162bb8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('restaurants', sa.Column('cuisine_seq', sa.BigInteger(), nullable=False, server_default='0'))
+    # Continue numbering from the ids already handed out
+    op.execute("""
+        UPDATE restaurants r
+        SET cuisine_seq = COALESCE(
+            (SELECT MAX(c.restaurant_specific_cuisine_id) FROM cuisines c WHERE c.restaurant_id = r.id), 0
+        )
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('restaurants', 'cuisine_seq')
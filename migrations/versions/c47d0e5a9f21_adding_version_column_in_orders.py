@@ -0,0 +1,28 @@
+"""adding version column in orders
+
+Revision ID: c47d0e5a9f21
+Revises: b7c8ae1964c4
+Create Date: 2026-10-19 14:03:27.884519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c47d0e5a9f21'
+down_revision: Union[str, Sequence[str], None] = 'b7c8ae1964c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('orders', sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('orders', 'version')
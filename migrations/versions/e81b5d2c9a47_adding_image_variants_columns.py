@@ -0,0 +1,31 @@
+"""adding image_variants columns in restaurants and users
+
+Revision ID: e81b5d2c9a47
+Revises: 52b619eb7a8a
+Create Date: 2026-10-19 16:41:05.218734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e81b5d2c9a47'
+down_revision: Union[str, Sequence[str], None] = '52b619eb7a8a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('restaurants', sa.Column('image_variants', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+    op.add_column('users', sa.Column('image_variants', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'image_variants')
+    op.drop_column('restaurants', 'image_variants')
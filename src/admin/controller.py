@@ -0,0 +1,107 @@
+# src/admin/controller.py
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from typing import Literal, Optional
+
+from observability.slow_queries import slow_query_log, SLOW_QUERY_MS, SLOW_QUERY_EXPLAIN_SAMPLE_RATE
+from observability.profiling import profile_store
+from observability.memory import memory_snapshots
+from .service import require_admin
+
+
+router = APIRouter(
+    prefix='/admin',
+    tags=['admin'],
+    dependencies=[Depends(require_admin)],
+)
+
+
+@router.get("/slow-queries")
+def get_slow_queries(
+    limit: int = Query(50, ge=1, le=500),
+    route: Optional[str] = Query(None, description="Only entries whose route contains this, e.g. 'my-orders'"),
+    min_ms: float = Query(0, ge=0),
+):
+    """
+    Recent statements slower than SLOW_QUERY_MS in this worker, newest first.
+    `explain` is the EXPLAIN (ANALYZE, BUFFERS) plan for sampled SELECTs,
+    "pending" while it is being captured, null when not sampled.
+    """
+    return {
+        "threshold_ms": SLOW_QUERY_MS,
+        "explain_sample_rate": SLOW_QUERY_EXPLAIN_SAMPLE_RATE,
+        "entries": slow_query_log.recent(limit=limit, route=route, min_ms=min_ms),
+    }
+
+
+@router.delete("/slow-queries", status_code=status.HTTP_204_NO_CONTENT)
+def clear_slow_queries():
+    slow_query_log.clear()
+
+
+# ==========================================================
+# 🔹 Request profiles (send a request with `X-Profile: 1` + X-Admin-Token)
+
+@router.get("/profiles")
+def list_profiles():
+    """Profiles kept by this worker, newest first."""
+    return profile_store.list()
+
+
+@router.get("/profiles/{profile_id}")
+def get_profile(profile_id: str, format: Literal["collapsed", "json"] = "collapsed"):
+    """
+    `collapsed`: "frame;frame;frame count" lines (speedscope, flamegraph.pl).
+    `json`: the summary plus the same stacks as a dict.
+    """
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found (other worker, or already evicted)")
+    if format == "json":
+        return {**profile.summary(), "stacks": dict(profile.samples.most_common())}
+    return Response(content=profile.collapsed(), media_type="text/plain",
+                    headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.collapsed.txt"'})
+
+
+# ==========================================================
+# 🔹 Memory (tracemalloc)
+
+GroupBy = Literal["lineno", "filename", "traceback"]
+
+
+@router.get("/memory")
+def get_memory_status():
+    return memory_snapshots.status()
+
+
+@router.post("/memory/tracing")
+def start_memory_tracing(frames: int = Query(10, ge=1, le=50, description="Stack depth kept per allocation")):
+    return memory_snapshots.start(frames)
+
+
+@router.delete("/memory/tracing")
+def stop_memory_tracing():
+    """Stops tracing and drops the snapshots (both cost memory)."""
+    return memory_snapshots.stop()
+
+
+@router.post("/memory/snapshots")
+def take_memory_snapshot(group_by: GroupBy = "lineno", limit: int = Query(25, ge=1, le=200)):
+    snapshot = memory_snapshots.take(group_by, limit)
+    if snapshot is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="tracemalloc is not tracing; POST /admin/memory/tracing first")
+    return snapshot
+
+
+@router.get("/memory/snapshots/{snapshot_id}/diff")
+def diff_memory_snapshots(
+    snapshot_id: int,
+    base: int = Query(..., description="Older snapshot id to compare against"),
+    group_by: GroupBy = "lineno",
+    limit: int = Query(25, ge=1, le=200),
+):
+    """What grew between snapshot `base` and `snapshot_id`, biggest growth first."""
+    diff = memory_snapshots.diff(snapshot_id, base, group_by, limit)
+    if diff is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Snapshot not found (other worker, or already evicted)")
+    return {"snapshot": snapshot_id, "base": base, "group_by": group_by, "top": diff}
@@ -0,0 +1,23 @@
+# src/admin/service.py
+
+from fastapi import Header, HTTPException, status
+from typing import Optional
+import hmac, os
+
+
+# Operator endpoints (/admin/...) are only served when ADMIN_TOKEN is set, to
+# requests that send it in the X-Admin-Token header.
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+
+
+def is_admin_token(token: Optional[str]) -> bool:
+    return bool(ADMIN_TOKEN) and bool(token) and hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Dependency for operator-only endpoints."""
+    if not ADMIN_TOKEN:
+        # Not configured: behave as if the endpoints did not exist
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token")
@@ -8,6 +8,8 @@ from orders.controller import router as orders_router
 from stats.controller import router as stats_router
 from feedbacks.controller import router as feedback_router
 from search.controller import router as search_router
+from observability.controller import router as observability_router
+from admin.controller import router as admin_router
 
 def register_routes(app: FastAPI):
     app.include_router(auth_router)
@@ -17,4 +19,6 @@ def register_routes(app: FastAPI):
     app.include_router(orders_router)
     app.include_router(stats_router)
     app.include_router(feedback_router)
-    app.include_router(search_router)
\ No newline at end of file
+    app.include_router(search_router)
+    app.include_router(observability_router)
+    app.include_router(admin_router)
\ No newline at end of file
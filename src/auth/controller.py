@@ -4,10 +4,12 @@ from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 from typing import Annotated, Union
+import logging
 
 from database.core import get_db
 from services.authService import get_current_user_or_restaurant, get_password_hash, verify_password, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
 from models.r_schema import (Token)
+from services.rateLimitService import rate_limit
 from models.r_model import (User as UserModel, Restaurant as RestaurantModel)
 from services.authService import (
     verify_password, 
@@ -18,13 +20,15 @@ from services.authService import (
 )
 
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(
     prefix='/auth',
     tags=['auth']
 )
 
 
-@router.post("/token", response_model=Token)
+@router.post("/token", response_model=Token, dependencies=[Depends(rate_limit("login"))])
 def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     """
     Unified login endpoint for both users and restaurants.
@@ -33,8 +37,6 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db:
     user = db.query(UserModel).filter(UserModel.email == form_data.username).first()
     if user and verify_password(form_data.password, user.password):
 
-        print(f"\n\nUser trying to access: {user.email}")
-
         user_table_id_str = str(user.table_id)
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
@@ -42,7 +44,7 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db:
             expires_delta=access_token_expires
         )
 
-        print(f"\n\n\tAccess Token: {access_token}\n\n")
+        logger.info("User %s logged in", user.table_id)
 
         user_details = {
             "username": user.username,
@@ -50,7 +52,6 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db:
             "image_url": user.image_url,
             "current_location": user.current_location,
         }
-        print(f"\n\n user location: {user.current_location}\n\n")
         
         return JSONResponse(content={
             "message": 'user is authenticated', 
@@ -64,16 +65,14 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db:
     restaurant = db.query(RestaurantModel).filter(RestaurantModel.gstIN == form_data.username).first()
     if restaurant and verify_password(form_data.password, restaurant.password):
 
-        print(f"\n\nRestaurant trying to access: {restaurant.name}")
-
         restaurant_table_id_str = str(restaurant.table_id)
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
             data={"sub": restaurant_table_id_str, "is_restaurant": True, "user_id": restaurant.gstIN},
             expires_delta=access_token_expires
         )
-        
-        print(f"\n\n\tAccess Token: {access_token}\n\n")
+
+        logger.info("Restaurant %s logged in", restaurant.table_id)
 
         user_details = {
             "name": restaurant.name,
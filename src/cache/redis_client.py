@@ -1,9 +1,11 @@
 # src/cache/redis_client.py
 
-import os
+import logging, os
 from dotenv import load_dotenv
 import redis.asyncio as redis # Use the standard asyncio redis library
 
+logger = logging.getLogger(__name__)
+
 load_dotenv()
 
 # This is the new URL you get from the Upstash dashboard
@@ -14,11 +16,11 @@ if UPSTASH_REDIS_REST_URL:
     try:
         # Create an async client from the URL
         redis_client = redis.from_url(UPSTASH_REDIS_REST_URL, decode_responses=True)
-        print("✅ Standard Redis connection pool created.")
+        logger.info("Redis connection pool created")
     except Exception as e:
-        print(f"❌ Could not create Redis connection pool: {e}")
+        logger.error("Could not create Redis connection pool: %s", e)
 else:
-    print("❌ UPSTASH_REDIS_REST_URL environment variable not set.")
+    logger.error("UPSTASH_REDIS_REST_URL environment variable not set")
 
 
 async def get_redis_client():
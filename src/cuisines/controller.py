@@ -1,15 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
 from sqlalchemy.orm import Session
-from sqlalchemy import func, or_
+from sqlalchemy import insert, update
 from typing import List, Optional
-import os, uuid
+import asyncio, logging
 
 from database.core import get_db
-from models.r_schema import (CuisineCreate, Cuisine, RestaurantMenuResponse, CuisineUpdate, CuisineCategory)
+from models.r_schema import (CuisineCreate, Cuisine, RestaurantMenuResponse, CuisineUpdate, CuisineCategory, CuisineBulkImportResponse,
+                              CuisineBatchRequest, CuisineBatchResult)
 from models.r_model import (Restaurant as RestaurantModel, Cuisine as CuisineModel)
 from restaurant.service import get_current_restaurant
+from cache.redis_client import get_redis_client
+from .service import (
+    get_active_categories, refresh_restaurant_categories,
+    allocate_cuisine_ids, parse_menu_upload, validate_menu_records, bump_menu_version,
+)
+
 
 
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix='/cuisine',
@@ -17,89 +25,241 @@ router = APIRouter(
 )
 
 @router.post("/register", response_model=Cuisine)
-def create_cuisine(
+async def create_cuisine(
     cuisine: CuisineCreate,
     db: Session = Depends(get_db),
+    redis_client = Depends(get_redis_client),
     current_restaurant: RestaurantModel = Depends(get_current_restaurant)
 ):
-    # 1. Find the highest existing restaurant_specific_cuisine_id for this restaurant
-    max_id = db.query(func.max(CuisineModel.restaurant_specific_cuisine_id)).filter(
-        CuisineModel.restaurant_id == current_restaurant.id
-    ).scalar()
-    new_cuisine_id = (max_id or 0) + 1
-
-    # 3. Create the new Cuisine object with the calculated ID
-    db_cuisine = CuisineModel(
-        cuisine_name=cuisine.cuisine_name,
-        price_half=cuisine.price_half,
-        price_full=cuisine.price_full,
-        category=cuisine.category,
-        restaurant_id=current_restaurant.id,
-        restaurant_specific_cuisine_id=new_cuisine_id
-    )
-
-    db.add(db_cuisine)
-    db.commit()
-    db.refresh(db_cuisine)
+    restaurant_id = current_restaurant.id
+
+    def insert_cuisine():
+        # 1. Reserve the next restaurant_specific_cuisine_id (atomic, no MAX() scan)
+        new_cuisine_id = allocate_cuisine_ids(db, restaurant_id)[0]
+
+        # 2. Create the new Cuisine object with the allocated ID
+        db_cuisine = CuisineModel(
+            cuisine_name=cuisine.cuisine_name,
+            price_half=cuisine.price_half,
+            price_full=cuisine.price_full,
+            category=cuisine.category,
+            cuisine_type=cuisine.cuisine_type,
+            restaurant_id=restaurant_id,
+            restaurant_specific_cuisine_id=new_cuisine_id
+        )
+
+        db.add(db_cuisine)
+        db.commit()
+        db.refresh(db_cuisine)
+        return db_cuisine
+
+    # The ORM work blocks, so it runs in a worker thread; only the Redis refresh runs on the loop
+    db_cuisine = await asyncio.to_thread(insert_cuisine)
+
+    await bump_menu_version(redis_client, restaurant_id)
+    if db_cuisine.cuisine_type:
+        await refresh_restaurant_categories(db, redis_client, current_restaurant)
     return db_cuisine
 
 
+# Onboarding: import a whole menu (CSV or JSON file) in one request
+@router.post("/bulk_import", response_model=CuisineBulkImportResponse)
+async def bulk_import_cuisines(
+    file: UploadFile = File(..., description="CSV with a header row, or a JSON list of cuisines"),
+    db: Session = Depends(get_db),
+    redis_client = Depends(get_redis_client),
+    current_restaurant: RestaurantModel = Depends(get_current_restaurant)
+):
+    """
+    Validates every record against CuisineCreate, inserts the valid ones with a
+    single multi-row INSERT and reports the rejected rows with their errors.
+    """
+    restaurant_id = current_restaurant.id
+    raw = await file.read()
+
+    def import_menu():
+        records = parse_menu_upload(file.filename, file.content_type, raw)
+        valid_cuisines, errors = validate_menu_records(records)
+
+        if not valid_cuisines:
+            return valid_cuisines, [], errors
+
+        # 1. Reserve all ids in one step
+        specific_ids = allocate_cuisine_ids(db, restaurant_id, len(valid_cuisines))
+
+        # 2. One multi-row INSERT ... RETURNING for the whole menu
+        rows = [
+            {
+                **cuisine.model_dump(),
+                "restaurant_id": restaurant_id,
+                "restaurant_specific_cuisine_id": specific_id,
+                "is_active": True,
+            }
+            for cuisine, specific_id in zip(valid_cuisines, specific_ids)
+        ]
+        created = db.scalars(insert(CuisineModel).returning(CuisineModel), rows).all()
+
+        # Serialize before commit so the response doesn't reload every row
+        created_cuisines = [Cuisine.model_validate(c) for c in created]
+        db.commit()
+        return valid_cuisines, created_cuisines, errors
+
+    # Parsing, validating and inserting a whole menu would stall every other request on the loop
+    valid_cuisines, created_cuisines, errors = await asyncio.to_thread(import_menu)
+
+    if not valid_cuisines:
+        return {"inserted": 0, "cuisines": [], "errors": errors}
+
+    await bump_menu_version(redis_client, restaurant_id)
+    if any(cuisine.cuisine_type for cuisine in valid_cuisines):
+        await refresh_restaurant_categories(db, redis_client, current_restaurant)
+
+    return {"inserted": len(created_cuisines), "cuisines": created_cuisines, "errors": errors}
+
+
 @router.patch("/{cuisine_id}", response_model=Cuisine)
-def update_cuisine(
+async def update_cuisine(
     cuisine_id: int,
     cuisine_data: CuisineUpdate,
     db: Session = Depends(get_db),
+    redis_client = Depends(get_redis_client),
     current_restaurant: RestaurantModel = Depends(get_current_restaurant)
 ):
-    print(f"\n\nReceived update request for cuisine ID {cuisine_id} of cuisine type: {cuisine_data.cuisine_type}\n\n")
-    # Find the cuisine and verify it belongs to the current restaurant
-    db_cuisine = db.query(CuisineModel).filter(
-        CuisineModel.id == cuisine_id,
-        CuisineModel.restaurant_id == current_restaurant.id
-    ).first()
-
-    if not db_cuisine:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Cuisine not found or does not belong to this restaurant."
-        )
-    
-    # Update fields if provided
-    for key, value in cuisine_data.model_dump().items():
-        if value is not None:
-            print(f"\n\nUpdating {key} to {value}\n\n")
-            setattr(db_cuisine, key, value)
-    if db_cuisine.is_active == False:
-        db_cuisine.is_active = True
-    db.commit()
-    db.refresh(db_cuisine)
+    restaurant_id = current_restaurant.id
+
+    def apply_update():
+        # Find the cuisine and verify it belongs to the current restaurant
+        db_cuisine = db.query(CuisineModel).filter(
+            CuisineModel.id == cuisine_id,
+            CuisineModel.restaurant_id == restaurant_id
+        ).first()
+
+        if not db_cuisine:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Cuisine not found or does not belong to this restaurant."
+            )
+
+        # Update fields if provided
+        for key, value in cuisine_data.model_dump().items():
+            if value is not None:
+                setattr(db_cuisine, key, value)
+        if db_cuisine.is_active == False:
+            db_cuisine.is_active = True
+        db.commit()
+        db.refresh(db_cuisine)
+        return db_cuisine
+
+    # The ORM work blocks, so it runs in a worker thread; only the Redis refresh runs on the loop
+    db_cuisine = await asyncio.to_thread(apply_update)
+
+    await bump_menu_version(redis_client, restaurant_id)
+    await refresh_restaurant_categories(db, redis_client, current_restaurant)
     return db_cuisine
 
 
 # 🔹 API to soft delete a cuisine
 @router.patch("/deactivate/{cuisine_id}", status_code=status.HTTP_204_NO_CONTENT)
-def deactivate_cuisine(
+async def deactivate_cuisine(
     cuisine_id: int,
     db: Session = Depends(get_db),
+    redis_client = Depends(get_redis_client),
     current_restaurant: RestaurantModel = Depends(get_current_restaurant)
 ):
-    # Find the cuisine and verify it belongs to the current restaurant
-    db_cuisine = db.query(CuisineModel).filter(
-        CuisineModel.id == cuisine_id,
-        CuisineModel.restaurant_id == current_restaurant.id
-    ).first()
+    restaurant_id = current_restaurant.id
 
-    if not db_cuisine:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Cuisine not found or does not belong to this restaurant."
-        )
+    def deactivate():
+        # Find the cuisine and verify it belongs to the current restaurant
+        db_cuisine = db.query(CuisineModel).filter(
+            CuisineModel.id == cuisine_id,
+            CuisineModel.restaurant_id == restaurant_id
+        ).first()
+
+        if not db_cuisine:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Cuisine not found or does not belong to this restaurant."
+            )
+
+        db_cuisine.is_active = False
+        db.commit()
+
+    await asyncio.to_thread(deactivate)
 
-    db_cuisine.is_active = False
-    db.commit()
+    await bump_menu_version(redis_client, restaurant_id)
+    await refresh_restaurant_categories(db, redis_client, current_restaurant)
     return
 
 
+# Price revisions / "sold out" toggles for many cuisines in one transaction
+@router.post("/batch_update", response_model=CuisineBatchResult)
+async def batch_update_cuisines(
+    batch: CuisineBatchRequest,
+    db: Session = Depends(get_db),
+    redis_client = Depends(get_redis_client),
+    current_restaurant: RestaurantModel = Depends(get_current_restaurant)
+):
+    """
+    Applies many CuisineUpdate / deactivate operations at once. Updated cuisines
+    are re-activated, same as PATCH /cuisine/{id}. The whole batch is rejected if
+    any id is unknown or belongs to another restaurant.
+    """
+    update_ids = {item.id for item in batch.updates}
+    deactivate_ids = set(batch.deactivate)
+
+    if update_ids & deactivate_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Cuisines cannot be updated and deactivated in the same batch: {sorted(update_ids & deactivate_ids)}"
+        )
+    if not update_ids and not deactivate_ids:
+        return {"updated": 0, "deactivated": 0}
+
+    restaurant_id = current_restaurant.id
+
+    def apply_batch():
+        # 1. One ownership check for every id in the batch
+        requested_ids = update_ids | deactivate_ids
+        owned_ids = {cuisine_id for (cuisine_id,) in db.query(CuisineModel.id).filter(
+            CuisineModel.id.in_(requested_ids),
+            CuisineModel.restaurant_id == restaurant_id
+        ).all()}
+
+        missing_ids = requested_ids - owned_ids
+        if missing_ids:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Cuisines not found or do not belong to this restaurant: {sorted(missing_ids)}"
+            )
+
+        # 2. Set-based UPDATEs (bulk UPDATE by primary key is sent as executemany batches)
+        if batch.updates:
+            rows = [
+                {**item.model_dump(exclude={"id"}, exclude_none=True), "id": item.id, "is_active": True}
+                for item in batch.updates
+            ]
+            db.execute(update(CuisineModel), rows)
+
+        if deactivate_ids:
+            db.execute(
+                update(CuisineModel)
+                .where(CuisineModel.id.in_(deactivate_ids))
+                .values(is_active=False)
+                .execution_options(synchronize_session=False)
+            )
+
+        db.commit()
+
+    # Ownership check, UPDATEs and commit block; they run in a worker thread
+    await asyncio.to_thread(apply_batch)
+
+    # 3. Invalidate derived menu data once for the whole batch
+    await bump_menu_version(redis_client, restaurant_id)
+    await refresh_restaurant_categories(db, redis_client, current_restaurant)
+
+    return {"updated": len(update_ids), "deactivated": len(deactivate_ids)}
+
+
 @router.get("/get_all", response_model=list[Cuisine])
 def list_cuisines(db: Session = Depends(get_db)):
     return db.query(CuisineModel).all()
@@ -135,81 +295,11 @@ def get_my_cuisines(
     return cuisines
 
 
-category_details_lookup = {
-    # Fast Food and Snacks
-    "Momos":    { "id": "cat1", "image": "https://placehold.co/100x100/CB6555/FFFFFF?text=Momos" },
-    "Noodles":  { "id": "cat2", "image": "https://placehold.co/100x100/5203FF/FFFFFF?text=Noodles" },
-    "Pizzas":   { "id": "cat3", "image": "https://placehold.co/100x100/BCCF57/FFFFFF?text=Pizzas" },
-    "Pastas":   { "id": "cat4", "image": "https://placehold.co/100x100/9AFF03/FFFFFF?text=Pastas" },
-    "Burgers":   { "id": "cat5", "image": "https://placehold.co/100x100/9AFF03/FFFFFF?text=Burgers" },
-    "Snacks":   { "id": "cat6", "image": "https://placehold.co/100x100/D7AC3E/FFFFFF?text=Snacks" },
-    "Chaat":   { "id": "cat7", "image": "https://placehold.co/100x100/A5833E/FFFFFF?text=Chaat" },
-    "Street Food":   { "id": "cat8", "image": "https://placehold.co/100x100/C1AC3E/FFFFFF?text=Street Food" },
-
-    # Foreign Famous Cuisines:
-    "Cheese":   { "id": "cat9", "image": "https://placehold.co/100x100/FFB303/FFFFFF?text=Cheese" },
-    "Nachos":   { "id": "cat10", "image": "https://placehold.co/100x100/FC6F03/FFFFFF?text=Nachos" },
-    "Shwarma":   { "id": "cat11", "image": "https://placehold.co/100x100/FF943E/FFFFFF?text=Shwarma" },
-
-    # Regular Categories
-    "Paneer":   { "id": "cat12", "image": "https://placehold.co/100x100/A6AfA4/FFFFFF?text=Paneer" },
-    "Egg":   { "id": "cat13", "image": "https://placehold.co/100x100/E1D7A4/FFFFFF?text=Egg" },
-    "Chicken":   { "id": "cat14", "image": "https://placehold.co/100x100/FB472B/FFFFFF?text=Chicken" },
-    "Non-Veg":   { "id": "cat15", "image": "https://placehold.co/100x100/FFDD03/FFFFFF?text=Non-Veg" },
-    "Biryani":   { "id": "cat16", "image": "https://placehold.co/100x100/FFDD03/FFFFFF?text=Biryani" },
-    "Rice":   { "id": "cat17", "image": "https://placehold.co/100x100/E1F1F9/FFFFFF?text=Rice" },
-
-    # Sweet Dishes
-    "Cakes":    { "id": "cat18", "image": "https://placehold.co/100x100/E8A66E/FFFFFF?text=Cakes" },
-    "Deserts":   { "id": "cat19", "image": "https://placehold.co/100x100/6EE8D8/FFFFFF?text=Deserts" },
-    "Ice Creams":   { "id": "cat20", "image": "https://placehold.co/100x100/6EE8D8/FFFFFF?text=Ice Creams" },
-
-    # Beverages and Drinks
-    "Shakes":   { "id": "cat21", "image": "https://placehold.co/100x100/7E7360/FFFFFF?text=Shakes" },
-    "Juices":   { "id": "cat22", "image": "https://placehold.co/100x100/6EE8D8/FFFFFF?text=Juices" },
-    "Cold Drinks":   { "id": "cat23", "image": "https://placehold.co/100x100/6EE8D8/FFFFFF?text=Cold Drinks" },
-    "Beverages":   { "id": "cat24", "image": "https://placehold.co/100x100/6EE8D8/FFFFFF?text=Beverages" },
-}
-
 @router.get( "/categories", response_model=List[CuisineCategory], )
 async def get_cuisine_categories_for_user(
     location: Optional[str] = Query(None, description="Optional: Filter categories by user's location"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    redis_client = Depends(get_redis_client),
 ):
-    print(f"GET /cuisine/categories hit. Location: {location}")
-
-    restaurant_query = db.query(RestaurantModel.id).filter(
-        RestaurantModel.operating_status == "Open"
-    )
-    if location:
-        locations_list = [loc.strip() for loc in location.split(',') if loc.strip()]
-        location_conditions = [RestaurantModel.location.ilike(f"%{loc}%") for loc in locations_list]
-        
-        if location_conditions:
-            restaurant_query = restaurant_query.filter(or_(*location_conditions))
-    
-    matching_restaurant_ids = [id for (id,) in restaurant_query.all()]
-
-    if not matching_restaurant_ids:
-        db_categories_tuples = []
-    else:
-        query = db.query(CuisineModel.cuisine_type).filter(
-            CuisineModel.restaurant_id.in_(matching_restaurant_ids),
-            CuisineModel.cuisine_type != None,
-            CuisineModel.is_active == True
-        )
-        db_categories_tuples = query.distinct().all()
-
-    active_categories_from_db = {category for (category,) in db_categories_tuples}
-    
-    final_cuisine_types = []
-    for name, details in category_details_lookup.items():
-        if name in active_categories_from_db:
-            final_cuisine_types.append({
-                "id": details["id"],
-                "name": name,
-                "image": details["image"]
-            })
-    
-    return final_cuisine_types
-
+    logger.debug("Listing categories for location %r", location)
+    return await get_active_categories(db, redis_client, location)
@@ -0,0 +1,525 @@
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session
+from sqlalchemy import or_, update, inspect as sa_inspect
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from pydantic import ValidationError
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from cachetools import TTLCache
+import asyncio, csv, hashlib, io, json, logging, os, time, uuid
+
+from models.r_model import (Restaurant as RestaurantModel, Cuisine as CuisineModel)
+from models.r_schema import CuisineCreate
+
+
+logger = logging.getLogger(__name__)
+
+category_details_lookup = {
+    # Fast Food and Snacks
+    "Momos":    { "id": "cat1", "image": "https://placehold.co/100x100/CB6555/FFFFFF?text=Momos" },
+    "Noodles":  { "id": "cat2", "image": "https://placehold.co/100x100/5203FF/FFFFFF?text=Noodles" },
+    "Pizzas":   { "id": "cat3", "image": "https://placehold.co/100x100/BCCF57/FFFFFF?text=Pizzas" },
+    "Pastas":   { "id": "cat4", "image": "https://placehold.co/100x100/9AFF03/FFFFFF?text=Pastas" },
+    "Burgers":   { "id": "cat5", "image": "https://placehold.co/100x100/9AFF03/FFFFFF?text=Burgers" },
+    "Snacks":   { "id": "cat6", "image": "https://placehold.co/100x100/D7AC3E/FFFFFF?text=Snacks" },
+    "Chaat":   { "id": "cat7", "image": "https://placehold.co/100x100/A5833E/FFFFFF?text=Chaat" },
+    "Street Food":   { "id": "cat8", "image": "https://placehold.co/100x100/C1AC3E/FFFFFF?text=Street Food" },
+
+    # Foreign Famous Cuisines:
+    "Cheese":   { "id": "cat9", "image": "https://placehold.co/100x100/FFB303/FFFFFF?text=Cheese" },
+    "Nachos":   { "id": "cat10", "image": "https://placehold.co/100x100/FC6F03/FFFFFF?text=Nachos" },
+    "Shwarma":   { "id": "cat11", "image": "https://placehold.co/100x100/FF943E/FFFFFF?text=Shwarma" },
+
+    # Regular Categories
+    "Paneer":   { "id": "cat12", "image": "https://placehold.co/100x100/A6AfA4/FFFFFF?text=Paneer" },
+    "Egg":   { "id": "cat13", "image": "https://placehold.co/100x100/E1D7A4/FFFFFF?text=Egg" },
+    "Chicken":   { "id": "cat14", "image": "https://placehold.co/100x100/FB472B/FFFFFF?text=Chicken" },
+    "Non-Veg":   { "id": "cat15", "image": "https://placehold.co/100x100/FFDD03/FFFFFF?text=Non-Veg" },
+    "Biryani":   { "id": "cat16", "image": "https://placehold.co/100x100/FFDD03/FFFFFF?text=Biryani" },
+    "Rice":   { "id": "cat17", "image": "https://placehold.co/100x100/E1F1F9/FFFFFF?text=Rice" },
+
+    # Sweet Dishes
+    "Cakes":    { "id": "cat18", "image": "https://placehold.co/100x100/E8A66E/FFFFFF?text=Cakes" },
+    "Deserts":   { "id": "cat19", "image": "https://placehold.co/100x100/6EE8D8/FFFFFF?text=Deserts" },
+    "Ice Creams":   { "id": "cat20", "image": "https://placehold.co/100x100/6EE8D8/FFFFFF?text=Ice Creams" },
+
+    # Beverages and Drinks
+    "Shakes":   { "id": "cat21", "image": "https://placehold.co/100x100/7E7360/FFFFFF?text=Shakes" },
+    "Juices":   { "id": "cat22", "image": "https://placehold.co/100x100/6EE8D8/FFFFFF?text=Juices" },
+    "Cold Drinks":   { "id": "cat23", "image": "https://placehold.co/100x100/6EE8D8/FFFFFF?text=Cold Drinks" },
+    "Beverages":   { "id": "cat24", "image": "https://placehold.co/100x100/6EE8D8/FFFFFF?text=Beverages" },
+}
+
+
+# ==========================================================
+# 🔹 Category availability index (location -> bitset of active categories)
+#
+# Bit i of a mask means CATEGORY_NAMES[i] is served by at least one open
+# restaurant. Redis layout:
+#   category_index                      hash: location -> OR of its restaurants' masks
+#   category_index:location:<location>  hash: restaurant_id -> restaurant mask
+# The "__built__" field stores a signature of CATEGORY_NAMES, so reordering or
+# extending category_details_lookup forces a rebuild instead of misreading bits.
+#
+# Only one worker rebuilds at a time (category_index:lock, SET NX); other readers
+# wait up to CATEGORY_INDEX_WAIT_SECONDS for it, then answer from Postgres. The
+# rebuild clears the index and bumps category_index:gen before it reads Postgres.
+# It then merges its snapshot, skipping restaurants that refresh_restaurant_categories
+# updated in the meantime (category_index:touched), since those writes are newer.
+
+CATEGORY_NAMES = list(category_details_lookup)
+CATEGORY_BITS = {name: 1 << i for i, name in enumerate(CATEGORY_NAMES)}
+
+CATEGORY_INDEX_KEY = "category_index"
+CATEGORY_INDEX_BUILT_FIELD = "__built__"
+CATEGORY_INDEX_TTL = 6 * 3600 # full rebuild from Postgres every 6 hours as a safety net
+CATEGORY_INDEX_SIGNATURE = hashlib.sha1("|".join(CATEGORY_NAMES).encode()).hexdigest()[:12]
+CATEGORY_INDEX_LOCK_KEY = f"{CATEGORY_INDEX_KEY}:lock"
+CATEGORY_INDEX_TOUCHED_KEY = f"{CATEGORY_INDEX_KEY}:touched"
+CATEGORY_INDEX_GENERATION_KEY = f"{CATEGORY_INDEX_KEY}:gen"
+CATEGORY_INDEX_LOCK_SECONDS = 60
+CATEGORY_INDEX_WAIT_SECONDS = 2.0
+_CATEGORY_INDEX_POLL_SECONDS = 0.05
+
+# Bitwise OR is done arithmetically because not every Redis host ships the Lua 'bit' library
+_BOR_LUA = """
+local function bor(a, b)
+  local result, bit = 0, 1
+  while a > 0 or b > 0 do
+    if (a % 2 == 1) or (b % 2 == 1) then result = result + bit end
+    a = math.floor(a / 2); b = math.floor(b / 2); bit = bit * 2
+  end
+  return result
+end
+"""
+
+# Sets (or removes, when ARGV[2] == "-1") one restaurant's mask and recomputes the
+# location's combined mask atomically, so concurrent updates in one city can't
+# overwrite each other. Applies only to a built index or one being rebuilt; in the
+# latter case the restaurant is marked touched so the rebuild keeps this write.
+# KEYS = location hash, index, lock, touched
+# ARGV = restaurant id, mask, location, built field, signature, touched ttl
+# Returns -1 when there is no index to maintain.
+_SET_RESTAURANT_MASK_LUA = _BOR_LUA + """
+if redis.call('EXISTS', KEYS[3]) == 1 then
+  redis.call('SADD', KEYS[4], ARGV[1])
+  redis.call('EXPIRE', KEYS[4], ARGV[6])
+elseif redis.call('HGET', KEYS[2], ARGV[4]) ~= ARGV[5] then
+  return -1
+end
+
+if ARGV[2] == "-1" then
+  redis.call('HDEL', KEYS[1], ARGV[1])
+else
+  redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+end
+
+local combined = 0
+for _, value in ipairs(redis.call('HVALS', KEYS[1])) do
+  combined = bor(combined, tonumber(value))
+end
+redis.call('HSET', KEYS[2], ARGV[3], combined)
+return combined
+"""
+
+# Starts a rebuild: drops the index, its location hashes and the touched set and
+# returns the new generation; 0 if the index turns out to be built already.
+# KEYS = index, touched, generation, then the location hashes to drop
+# ARGV = built field, signature, generation ttl
+_RESET_CATEGORY_INDEX_LUA = """
+if redis.call('HGET', KEYS[1], ARGV[1]) == ARGV[2] then return 0 end
+for i = 4, #KEYS do redis.call('DEL', KEYS[i]) end
+redis.call('DEL', KEYS[1], KEYS[2])
+local generation = redis.call('INCR', KEYS[3])
+redis.call('EXPIRE', KEYS[3], ARGV[3])
+return generation
+"""
+
+# Merges a rebuild's snapshot unless another rebuild started since (returns 0).
+# KEYS = index, touched, generation, lock, then one location hash per location
+# ARGV = generation, ttl, built field, signature, lock token, then per location:
+#        location, restaurant count, and that many (restaurant id, mask) pairs
+_MERGE_CATEGORY_INDEX_LUA = _BOR_LUA + """
+if redis.call('GET', KEYS[3]) ~= ARGV[1] then return 0 end
+local ttl = tonumber(ARGV[2])
+local i = 6
+for k = 5, #KEYS do
+  local location, count = ARGV[i], tonumber(ARGV[i + 1])
+  i = i + 2
+  for _ = 1, count do
+    if redis.call('SISMEMBER', KEYS[2], ARGV[i]) == 0 then
+      redis.call('HSET', KEYS[k], ARGV[i], ARGV[i + 1])
+    end
+    i = i + 2
+  end
+  local combined = 0
+  for _, value in ipairs(redis.call('HVALS', KEYS[k])) do
+    combined = bor(combined, tonumber(value))
+  end
+  redis.call('HSET', KEYS[1], location, combined)
+  redis.call('EXPIRE', KEYS[k], ttl)
+end
+redis.call('HSET', KEYS[1], ARGV[3], ARGV[4])
+redis.call('EXPIRE', KEYS[1], ttl)
+redis.call('DEL', KEYS[2])
+if redis.call('GET', KEYS[4]) == ARGV[5] then redis.call('DEL', KEYS[4]) end
+return 1
+"""
+
+_RELEASE_LOCK_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) end
+return 0
+"""
+
+
+def normalize_location(location: Optional[str]) -> str:
+    return (location or "").strip().lower()
+
+
+def categories_to_mask(categories: Iterable[Optional[str]]) -> int:
+    mask = 0
+    for name in categories:
+        mask |= CATEGORY_BITS.get(name, 0)
+    return mask
+
+
+def mask_to_categories(mask: int) -> List[dict]:
+    """Expands a mask into the response shape, in lookup order."""
+    return [
+        {"id": category_details_lookup[name]["id"], "name": name, "image": category_details_lookup[name]["image"]}
+        for name in CATEGORY_NAMES
+        if mask & CATEGORY_BITS[name]
+    ]
+
+
+def _location_key(location: str) -> str:
+    return f"{CATEGORY_INDEX_KEY}:location:{location}"
+
+
+def _restaurant_mask(db: Session, restaurant: RestaurantModel) -> int:
+    if restaurant.operating_status != "Open":
+        return 0
+    rows = db.query(CuisineModel.cuisine_type).filter(
+        CuisineModel.restaurant_id == restaurant.id,
+        CuisineModel.cuisine_type != None,
+        CuisineModel.is_active == True
+    ).distinct().all()
+    return categories_to_mask(cuisine_type for (cuisine_type,) in rows)
+
+
+def _restaurant_location_and_mask(db: Session, restaurant: RestaurantModel) -> Tuple[str, int]:
+    # Reading attributes expired by the caller's commit reloads the row, so this is blocking too
+    return restaurant.location, _restaurant_mask(db, restaurant)
+
+
+def _load_restaurant_masks(db: Session) -> Dict[str, Dict[int, int]]:
+    """location -> {restaurant_id: mask} for every restaurant, in a single query. Blocking."""
+    rows = db.query(
+        RestaurantModel.id, RestaurantModel.location, RestaurantModel.operating_status, CuisineModel.cuisine_type
+    ).outerjoin(
+        CuisineModel,
+        (CuisineModel.restaurant_id == RestaurantModel.id) & (CuisineModel.is_active == True)
+    ).distinct().all()
+
+    restaurant_masks = {}   # location -> {restaurant_id: mask}
+    for restaurant_id, location, operating_status, cuisine_type in rows:
+        masks = restaurant_masks.setdefault(normalize_location(location), {})
+        bit = CATEGORY_BITS.get(cuisine_type, 0) if operating_status == "Open" else 0
+        masks[restaurant_id] = masks.get(restaurant_id, 0) | bit
+    return restaurant_masks
+
+
+async def _wait_for_category_index(redis_client: Redis) -> Optional[dict]:
+    """Polls while another worker rebuilds; None if it is not done in CATEGORY_INDEX_WAIT_SECONDS."""
+    deadline = time.monotonic() + CATEGORY_INDEX_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        await asyncio.sleep(_CATEGORY_INDEX_POLL_SECONDS)
+        index = await redis_client.hgetall(CATEGORY_INDEX_KEY)
+        if index.get(CATEGORY_INDEX_BUILT_FIELD) == CATEGORY_INDEX_SIGNATURE:
+            return index
+    return None
+
+
+async def rebuild_category_index(db: Session, redis_client: Redis, stale_index: dict) -> Optional[dict]:
+    """
+    Recomputes the whole index from Postgres and merges it in, or waits for the
+    worker already doing so. `stale_index` is the unusable index just read.
+    Returns the top-level hash (location -> mask, as strings), or None if another
+    worker's rebuild did not finish in time.
+    """
+    lock_token = uuid.uuid4().hex
+    if not await redis_client.set(CATEGORY_INDEX_LOCK_KEY, lock_token, nx=True, ex=CATEGORY_INDEX_LOCK_SECONDS):
+        return await _wait_for_category_index(redis_client)
+
+    lock_released = False
+    try:
+        # 1. Clear the old index and start a generation, before reading Postgres
+        stale_keys = [_location_key(location) for location in stale_index if location != CATEGORY_INDEX_BUILT_FIELD]
+        generation = await redis_client.eval(
+            _RESET_CATEGORY_INDEX_LUA, 3 + len(stale_keys),
+            CATEGORY_INDEX_KEY, CATEGORY_INDEX_TOUCHED_KEY, CATEGORY_INDEX_GENERATION_KEY, *stale_keys,
+            CATEGORY_INDEX_BUILT_FIELD, CATEGORY_INDEX_SIGNATURE, CATEGORY_INDEX_TTL,
+        )
+        if not generation:
+            return await redis_client.hgetall(CATEGORY_INDEX_KEY)
+
+        # 2. Snapshot from Postgres, off the event loop
+        restaurant_masks = await asyncio.to_thread(_load_restaurant_masks, db)
+
+        # 3. Merge it, keeping restaurant updates that landed meanwhile (releases the lock)
+        index = {CATEGORY_INDEX_BUILT_FIELD: CATEGORY_INDEX_SIGNATURE}
+        args = [generation, CATEGORY_INDEX_TTL, CATEGORY_INDEX_BUILT_FIELD, CATEGORY_INDEX_SIGNATURE, lock_token]
+        for location, masks in restaurant_masks.items():
+            combined = 0
+            for mask in masks.values():
+                combined |= mask
+            index[location] = str(combined)
+            args += [location, len(masks)]
+            for restaurant_id, mask in masks.items():
+                args += [restaurant_id, mask]
+        merged = await redis_client.eval(
+            _MERGE_CATEGORY_INDEX_LUA, 4 + len(restaurant_masks),
+            CATEGORY_INDEX_KEY, CATEGORY_INDEX_TOUCHED_KEY, CATEGORY_INDEX_GENERATION_KEY, CATEGORY_INDEX_LOCK_KEY,
+            *[_location_key(location) for location in restaurant_masks], *args,
+        )
+        lock_released = True
+        if not merged:
+            logger.debug("Category index rebuild superseded by a newer one")
+        return index
+    finally:
+        if not lock_released:
+            try:
+                await redis_client.eval(_RELEASE_LOCK_LUA, 1, CATEGORY_INDEX_LOCK_KEY, lock_token)
+            except RedisError as e:
+                logger.warning("Could not release category index lock: %s", e)
+
+
+async def refresh_restaurant_categories(
+    db: Session,
+    redis_client: Redis,
+    restaurant: RestaurantModel,
+    previous_location: Optional[str] = None,
+):
+    """
+    Write-through hook for menu and status changes. Recomputes one restaurant's
+    mask (one small query on its own cuisines) and folds it into its location.
+    Failures are logged and left to the periodic rebuild; they never fail the request.
+    The database reads run in a worker thread, so callers may pass a restaurant
+    whose attributes their commit expired.
+    """
+    # The identity survives expiry, so this never touches the database
+    restaurant_id = sa_inspect(restaurant).identity[0]
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.hget(CATEGORY_INDEX_KEY, CATEGORY_INDEX_BUILT_FIELD)
+        pipe.exists(CATEGORY_INDEX_LOCK_KEY)
+        index_signature, rebuilding = await pipe.execute()
+        if index_signature != CATEGORY_INDEX_SIGNATURE and not rebuilding:
+            # Nothing (valid) to maintain yet; the next read rebuilds from scratch.
+            return
+
+        current_location, mask = await asyncio.to_thread(_restaurant_location_and_mask, db, restaurant)
+        location = normalize_location(current_location)
+        old_location = normalize_location(previous_location) if previous_location is not None else location
+        if old_location != location:
+            await redis_client.eval(
+                _SET_RESTAURANT_MASK_LUA, 4, _location_key(old_location), CATEGORY_INDEX_KEY,
+                CATEGORY_INDEX_LOCK_KEY, CATEGORY_INDEX_TOUCHED_KEY,
+                str(restaurant_id), "-1", old_location,
+                CATEGORY_INDEX_BUILT_FIELD, CATEGORY_INDEX_SIGNATURE, CATEGORY_INDEX_LOCK_SECONDS,
+            )
+
+        await redis_client.eval(
+            _SET_RESTAURANT_MASK_LUA, 4, _location_key(location), CATEGORY_INDEX_KEY,
+            CATEGORY_INDEX_LOCK_KEY, CATEGORY_INDEX_TOUCHED_KEY,
+            str(restaurant_id), str(mask), location,
+            CATEGORY_INDEX_BUILT_FIELD, CATEGORY_INDEX_SIGNATURE, CATEGORY_INDEX_LOCK_SECONDS,
+        )
+    except RedisError as e:
+        logger.warning("Could not update category index for restaurant %s: %s", restaurant_id, e)
+
+
+def _categories_from_db(db: Session, locations_list: List[str]) -> List[dict]:
+    """Fallback used when Redis is unreachable or another worker's rebuild is slow. Blocking."""
+    query = db.query(CuisineModel.cuisine_type).join(RestaurantModel).filter(
+        RestaurantModel.operating_status == "Open",
+        CuisineModel.cuisine_type != None,
+        CuisineModel.is_active == True
+    )
+    if locations_list:
+        query = query.filter(or_(*[RestaurantModel.location.ilike(f"%{loc}%") for loc in locations_list]))
+    return mask_to_categories(categories_to_mask(t for (t,) in query.distinct().all()))
+
+
+async def get_active_categories(db: Session, redis_client: Redis, location: Optional[str]) -> List[dict]:
+    """
+    Returns the categories served by open restaurants in the given (comma separated)
+    locations. Matching keeps the old `ILIKE %loc%` semantics, but runs over the
+    handful of indexed locations instead of every restaurant row.
+    """
+    locations_list = [normalize_location(loc) for loc in (location or "").split(',') if loc.strip()]
+
+    try:
+        index = await redis_client.hgetall(CATEGORY_INDEX_KEY)
+        if index.get(CATEGORY_INDEX_BUILT_FIELD) != CATEGORY_INDEX_SIGNATURE:
+            index = await rebuild_category_index(db, redis_client, index)
+    except RedisError as e:
+        logger.warning("Category index unavailable, falling back to Postgres: %s", e)
+        index = None
+    if index is None:
+        return await asyncio.to_thread(_categories_from_db, db, locations_list)
+
+    mask = 0
+    for indexed_location, location_mask in index.items():
+        if indexed_location == CATEGORY_INDEX_BUILT_FIELD:
+            continue
+        if not locations_list or any(loc in indexed_location for loc in locations_list):
+            mask |= int(location_mask)
+    return mask_to_categories(mask)
+
+
+# ==========================================================
+# 🔹 Per-restaurant cuisine numbering and bulk menu import
+
+MAX_IMPORT_ROWS = 1000
+
+
+def allocate_cuisine_ids(db: Session, restaurant_id: int, count: int = 1) -> range:
+    """
+    Reserves `count` consecutive restaurant_specific_cuisine_ids with a single
+    UPDATE ... RETURNING on the restaurant's counter. The row lock it takes is
+    held until the caller commits, so concurrent inserts can never reuse an id.
+    """
+    last_id = db.execute(
+        update(RestaurantModel)
+        .where(RestaurantModel.id == restaurant_id)
+        .values(cuisine_seq=RestaurantModel.cuisine_seq + count)
+        .returning(RestaurantModel.cuisine_seq)
+        .execution_options(synchronize_session=False)
+    ).scalar_one()
+    return range(last_id - count + 1, last_id + 1)
+
+
+def parse_menu_upload(filename: Optional[str], content_type: Optional[str], raw: bytes) -> List[dict]:
+    """
+    Reads an uploaded menu as a list of records. JSON may be a list of objects
+    or {"cuisines": [...]}; anything else is read as CSV with a header row.
+    Empty CSV cells become None so optional fields validate as missing.
+    """
+    try:
+        text = raw.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="File must be UTF-8 encoded.")
+
+    is_json = (filename or "").lower().endswith(".json") or "json" in (content_type or "")
+    if is_json:
+        try:
+            records = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid JSON: {e}")
+        if isinstance(records, dict):
+            records = records.get("cuisines")
+        if not isinstance(records, list):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="JSON must be a list of cuisines or an object with a 'cuisines' list."
+            )
+    else:
+        reader = csv.DictReader(io.StringIO(text))
+        records = [
+            {key.strip(): (value.strip() or None) if isinstance(value, str) else value
+             for key, value in row.items() if key}
+            for row in reader
+        ]
+
+    if len(records) > MAX_IMPORT_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A single import is limited to {MAX_IMPORT_ROWS} cuisines."
+        )
+    return records
+
+
+def validate_menu_records(records: List[dict]) -> Tuple[List[CuisineCreate], List[dict]]:
+    """Splits records into valid CuisineCreate objects and per-row error reports."""
+    valid, errors = [], []
+    for row_number, record in enumerate(records, start=1):
+        if not isinstance(record, dict):
+            errors.append({"row": row_number, "errors": ["Each cuisine must be an object."]})
+            continue
+        try:
+            valid.append(CuisineCreate.model_validate(record))
+        except ValidationError as e:
+            errors.append({
+                "row": row_number,
+                "errors": [f"{'.'.join(str(part) for part in err['loc']) or 'row'}: {err['msg']}" for err in e.errors()],
+            })
+    return valid, errors
+
+
+# ==========================================================
+# 🔹 Per-restaurant price book for order pricing
+#
+# Each worker keeps {cuisine_id: PriceEntry} per restaurant in memory. A counter
+# in Redis (menu_version:restaurant:<id>) is bumped after every committed menu
+# change, so a worker notices with one GET and reloads instead of serving stale
+# prices. The TTL is only a safety net for a missed bump.
+
+PRICE_BOOK_MAX_RESTAURANTS = int(os.environ.get('PRICE_BOOK_MAX_RESTAURANTS', '2000'))
+PRICE_BOOK_TTL_SECONDS = int(os.environ.get('PRICE_BOOK_TTL_SECONDS', '300'))
+
+
+class PriceEntry(NamedTuple):
+    cuisine_name: str
+    price_half: Optional[float]
+    price_full: float
+    is_active: bool
+    version: int
+
+
+_price_books: TTLCache = TTLCache(maxsize=PRICE_BOOK_MAX_RESTAURANTS, ttl=PRICE_BOOK_TTL_SECONDS)
+
+
+def _menu_version_key(restaurant_id: int) -> str:
+    return f"menu_version:restaurant:{restaurant_id}"
+
+
+async def bump_menu_version(redis_client: Redis, restaurant_id: int):
+    """Call after committing any change to a restaurant's cuisines."""
+    _price_books.pop(restaurant_id, None)
+    try:
+        await redis_client.incr(_menu_version_key(restaurant_id))
+    except RedisError as e:
+        logger.warning("Could not bump menu version for restaurant %s: %s", restaurant_id, e)
+
+
+def _load_price_book(db: Session, restaurant_id: int, version: int) -> Dict[int, PriceEntry]:
+    rows = db.query(
+        CuisineModel.id, CuisineModel.cuisine_name, CuisineModel.price_half, CuisineModel.price_full, CuisineModel.is_active
+    ).filter(CuisineModel.restaurant_id == restaurant_id).all()
+    return {
+        cuisine_id: PriceEntry(name, price_half, price_full, is_active, version)
+        for cuisine_id, name, price_half, price_full, is_active in rows
+    }
+
+
+async def get_price_book(db: Session, redis_client: Redis, restaurant_id: int) -> Dict[int, PriceEntry]:
+    """
+    Returns the restaurant's catalog prices, reading Postgres only when this
+    worker has no copy for the current menu version. Without Redis the version
+    can't be checked, so the catalog is read every time.
+    """
+    try:
+        version = int(await redis_client.get(_menu_version_key(restaurant_id)) or 0)
+    except RedisError as e:
+        logger.warning("Menu version unavailable, reading prices from Postgres: %s", e)
+        version = None
+
+    cached = _price_books.get(restaurant_id)
+    if version is not None and cached is not None and cached[0] == version:
+        return cached[1]
+
+    book = await asyncio.to_thread(_load_price_book, db, restaurant_id, version or 0)
+    if version is not None:
+        _price_books[restaurant_id] = (version, book)
+    return book
@@ -3,6 +3,8 @@ from sqlalchemy.orm import sessionmaker, declarative_base
 from dotenv import load_dotenv
 import os
 
+from observability.slow_queries import install_slow_query_log
+
 
 load_dotenv()
 DB_URL = os.getenv(
@@ -14,6 +16,8 @@ if not DB_URL:
     raise ValueError("DATABASE_URL environment variable is not set.")
 
 engine = create_engine(DB_URL)
+# Statements over SLOW_QUERY_MS go to the slow-query log (GET /admin/slow-queries)
+install_slow_query_log(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -2,6 +2,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import Optional
+import logging
 
 from database.core import get_db
 # Keep FeedbackCreate, it works for both create and update payload
@@ -9,6 +10,8 @@ from models.r_schema import FeedbackCreate, Feedback
 from models.r_model import Feedback as FeedbackModel, Order as OrderModel, User as UserModel
 from user.service import get_current_user
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(
     prefix='/feedback',
     tags=['feedback']
@@ -42,13 +45,13 @@ def submit_or_update_feedback( # Renamed function for clarity
 
     if existing_feedback:
         # --- UPDATE PATH ---
-        print(f"Updating existing feedback for order {feedback_data.order_id}")
+        logger.debug("Updating feedback for order %s", feedback_data.order_id)
         existing_feedback.comments = feedback_data.comments
         existing_feedback.rating = feedback_data.rating
         db_feedback = existing_feedback # Use the existing object
     else:
         # --- CREATE PATH ---
-        print(f"Creating new feedback for order {feedback_data.order_id}")
+        logger.debug("Creating feedback for order %s", feedback_data.order_id)
         db_feedback = FeedbackModel(
             comments=feedback_data.comments,
             rating=feedback_data.rating,
@@ -2,15 +2,51 @@
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.staticfiles import StaticFiles
+from contextlib import asynccontextmanager
+
+# Before the app modules, so records logged while they import go through the queue too
+from observability.logs import configure_logging, stop_logging, RequestIdMiddleware
+configure_logging()
 
 from database.core import engine, Base
 from api import register_routes
+import cache.redis_client as redis_cache
+from notifications.service import start_outbox_dispatcher, stop_outbox_dispatcher
+from notifications.hub import notification_hub, start_notification_hub, stop_notification_hub
+from observability.metrics import MetricsMiddleware, instrument_engine, instrument_redis_client, register_hub_collector
+from observability.budgets import QueryBudgetMiddleware
+from observability.profiling import ProfilingMiddleware
+from orders.services import start_order_group_commit, stop_order_group_commit
+from services.storageService import STORAGE_BACKEND, LOCAL_STORAGE_DIR, LOCAL_STORAGE_URL, get_storage
+import asyncio, os
 
 
 # ==========================================================
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Set up the storage client now, off the event loop, instead of on the first upload
+    await asyncio.to_thread(get_storage)
+    # Background workers that live as long as the app process
+    start_outbox_dispatcher()
+    start_notification_hub()
+    start_order_group_commit()
+    yield
+    await stop_order_group_commit()
+    await stop_notification_hub()
+    await stop_outbox_dispatcher()
+    stop_logging()
+
+
 Base.metadata.create_all(bind=engine)
-app = FastAPI()
+
+# Prometheus instrumentation (exposed on GET /metrics)
+instrument_engine(engine)
+instrument_redis_client(redis_cache.redis_client)
+register_hub_collector(notification_hub)
+
+app = FastAPI(lifespan=lifespan)
 origins = [
     "http://localhost.tiangolo.com",
     "https://localhost.tiangolo.com",
@@ -26,4 +62,16 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-register_routes(app)
\ No newline at end of file
+# Added inside-out: QueryBudgetMiddleware reads the counters MetricsMiddleware sets up
+app.add_middleware(QueryBudgetMiddleware)
+app.add_middleware(MetricsMiddleware)
+# Outermost, so a profiled request (X-Profile: 1 + X-Admin-Token) includes every middleware
+app.add_middleware(ProfilingMiddleware)
+# X-Request-ID wraps everything, so every log line of a request (profiler included) carries it
+app.add_middleware(RequestIdMiddleware)
+register_routes(app)
+
+# Offline / development: serve what the local storage backend wrote
+if STORAGE_BACKEND == "local":
+    os.makedirs(LOCAL_STORAGE_DIR, exist_ok=True)
+    app.mount(LOCAL_STORAGE_URL, StaticFiles(directory=LOCAL_STORAGE_DIR), name="media")
\ No newline at end of file
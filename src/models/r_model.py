@@ -1,7 +1,8 @@
 
 # models/r_model.py
 
-from sqlalchemy import ForeignKey, String, Float, DateTime, func, BigInteger, UUID, Identity, Integer
+from sqlalchemy import ForeignKey, String, Float, DateTime, func, BigInteger, UUID, Identity, Integer, Text, UniqueConstraint, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from database.core import Base
 from datetime import datetime
@@ -19,6 +20,8 @@ class User(Base):
     email: Mapped[str] = mapped_column(String(100), unique=True, index=True, nullable=False)
     password: Mapped[str] = mapped_column(String(128), nullable=False) # Increased size for hashed passwords
     image_url: Mapped[str] = mapped_column(String(255), nullable=True)
+    # resized copies of image_url, {"thumb": {"webp": url, "jpeg": url}, ...} (see services/imageService.py)
+    image_variants: Mapped[Optional[dict]] = mapped_column(JSONB, nullable=True)
     location: Mapped[str] = mapped_column(String(100), nullable=True)
     current_location: Mapped[str] = mapped_column(String(100), nullable=True)
     is_hotel_owner: Mapped[bool] = mapped_column(default=False)
@@ -42,6 +45,7 @@ class Restaurant(Base):
 
     # media info  
     image_url: Mapped[str] = mapped_column(String(255), nullable=True)
+    image_variants: Mapped[Optional[dict]] = mapped_column(JSONB, nullable=True)
     mobile_number: Mapped[str] = mapped_column(String(20), nullable=False)
     support_email: Mapped[str] = mapped_column(String(100), nullable=False)
     gstIN: Mapped[str] = mapped_column(String(15), unique=True, index=True, nullable=False)
@@ -54,6 +58,9 @@ class Restaurant(Base):
     # announcements 
     announcement_text: Mapped[str | None] = mapped_column(String(1000), nullable=True)
 
+    # last restaurant_specific_cuisine_id handed out (bumped atomically, see cuisines/service.py)
+    cuisine_seq: Mapped[int] = mapped_column(BigInteger, default=0, server_default="0", nullable=False)
+
 
     # Relationships
     cuisines = relationship("Cuisine", back_populates="restaurant")
@@ -94,6 +101,8 @@ class Order(Base):
     order_date: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=func.now(), nullable=False)
     status: Mapped[str] = mapped_column(String(20), default="Pending", nullable=False)
     cancelled_by: Mapped[str | None] = mapped_column(String(20), nullable=True)
+    # Bumped by every status transition (see orders/services.transition_order_status)
+    version: Mapped[int] = mapped_column(Integer, default=1, server_default="1", nullable=False)
     
     # Relationships
     user = relationship("User", back_populates="orders")
@@ -135,4 +144,32 @@ class Feedback(Base):
     user = relationship("User", back_populates="feedbacks")
     restaurant = relationship("Restaurant", back_populates="feedbacks")
 
-    
\ No newline at end of file
+
+class NotificationOutbox(Base):
+    """Notifications written in the same transaction as the change they announce."""
+    __tablename__ = "notification_outbox"
+    __table_args__ = (
+        # keeps the dispatcher's "next unpublished batch" scan small
+        Index("ix_notification_outbox_pending", "id", postgresql_where="published_at IS NULL"),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, Identity(start=1, always=True), primary_key=True)
+    channel: Mapped[str] = mapped_column(String(255), nullable=False) # e.g. location:<location>:feed
+    payload: Mapped[str] = mapped_column(Text, nullable=False) # JSON string, published as-is
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=func.now(), nullable=False)
+    published_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+
+class IdempotencyKey(Base):
+    """Postgres fallback for idempotency records when Redis is unavailable."""
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (UniqueConstraint("scope", "key"),)
+
+    id: Mapped[int] = mapped_column(BigInteger, Identity(start=1, always=True), primary_key=True)
+    scope: Mapped[str] = mapped_column(String(100), nullable=False) # e.g. "order:create:user:42"
+    key: Mapped[str] = mapped_column(String(255), nullable=False)
+    fingerprint: Mapped[str] = mapped_column(String(64), nullable=False) # sha256 of the request body
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default="in_progress")
+    response: Mapped[str | None] = mapped_column(Text, nullable=True) # JSON of the first response
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
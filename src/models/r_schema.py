@@ -13,6 +13,9 @@ OperatingStatus = Literal["Open", "Closed"]
 KitchenStatus = Literal["Normal", "Busy", "Emergency"]
 DeliveryStatus = Literal["Active", "Inactive"]
 
+# Image variants: size name ("thumb", "card", "hero") -> format ("webp", "jpeg") -> URL
+ImageVariants = Dict[str, Dict[str, str]]
+
 
 # Cuisines: 
 class CuisineBase(BaseModel):
@@ -99,6 +102,14 @@ class CuisineUpdate(BaseModel):
     category: Optional[DietaryCategory] = None
     cuisine_type: Optional[str] = None  
 
+# One entry of a batch update: the cuisine id plus the CuisineUpdate fields
+class CuisineBatchUpdateItem(CuisineUpdate):
+    id: int
+
+class CuisineBatchRequest(BaseModel):
+    updates: List[CuisineBatchUpdateItem] = Field(default_factory=list, max_length=500)
+    deactivate: List[int] = Field(default_factory=list, max_length=500) # cuisine ids to soft delete
+
 class RestaurantUpdate(BaseModel):
     name: Optional[str] = None
     location: Optional[str] = None
@@ -117,6 +128,11 @@ class UserUpdate(UserBase):
 
 class OrderStatusUpdate(BaseModel):
     new_status: OrderStatus
+    expected_version: Optional[int] = None # reject with 409 if the order changed since this version
+
+class OrderBulkStatusUpdate(BaseModel):
+    order_ids: List[int] = Field(..., min_length=1, max_length=500)
+    new_status: OrderStatus
 
 # ======================================
 
@@ -133,6 +149,23 @@ class Cuisine(CuisineBase):
     class Config:
         from_attributes = True
 
+class CuisineBatchResult(BaseModel):
+    updated: int
+    deactivated: int
+
+class OrderBulkStatusResult(BaseModel):
+    new_status: OrderStatus
+    order_ids: List[int] # orders that were updated, ascending
+
+class CuisineImportError(BaseModel):
+    row: int # 1-based position of the record in the uploaded file
+    errors: List[str]
+
+class CuisineBulkImportResponse(BaseModel):
+    inserted: int
+    cuisines: List[Cuisine]
+    errors: List[CuisineImportError]
+
 # --- YAHAN ADD KIYA HAI ---
 # User ke homepage par categories dikhane ke liye schema
 class CuisineCategory(BaseModel):
@@ -171,6 +204,7 @@ class Order(BaseModel):
     total_price: float # backend calculated price 
     # The response should contain the list of structured items from the database relationship
     order_items: List[OrderItem] 
+    version: int = 1
 
     class Config:
         from_attributes = True
@@ -201,6 +235,7 @@ class Restaurant(RestaurantBase):
     kitchen_status: str
     delivery_status: str
     image_url: Optional[str] = None
+    image_variants: Optional[ImageVariants] = None
     table_id: Optional[UUID] = None 
 
     class Config:
@@ -234,6 +269,7 @@ class SearchSuggestion(BaseModel):
     id: Optional[int] = None    
     name: str    
     image_url: Optional[str] = None
+    image_variants: Optional[ImageVariants] = None
     
     class Config:
         from_attributes = True
@@ -258,6 +294,7 @@ class TokenData(BaseModel):
 class User(UserBase):
     id: int
     image_url: Optional[str] = None
+    image_variants: Optional[ImageVariants] = None
     table_id: Optional[UUID] = None
     current_location: Optional[str] = None
 
@@ -276,6 +313,7 @@ class OrderForRestaurantResponse(BaseModel):
     total_price: float
     user: UserInfoForOrder         
     order_items: List[OrderItem] 
+    version: int = 1
     # cancelled_by: Optional[str] = None
 
     class Config:
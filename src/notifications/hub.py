@@ -0,0 +1,173 @@
+# src/notifications/hub.py
+
+from redis.exceptions import RedisError
+from typing import Dict, Iterable, Optional, Set
+import asyncio, logging, os
+
+import cache.redis_client as redis_cache
+from .service import parse_published_notification
+
+logger = logging.getLogger(__name__)
+
+
+# One pattern subscription per worker process; every SSE client gets a bounded
+# queue fed by the hub instead of its own Redis connection.
+NOTIFICATION_PATTERNS = ("user:*:notifications", "restaurant:*:notifications", "location:*:feed")
+
+HUB_CLIENT_QUEUE_SIZE = int(os.environ.get('HUB_CLIENT_QUEUE_SIZE', '100'))
+_MAX_BACKOFF_SECONDS = 30.0
+
+
+class Subscription:
+    """
+    One connected client's view of one or more channels. The queue holds
+    (channel, stream id, payload) tuples; `None` means: stop.
+    """
+
+    def __init__(self, channels: Iterable[str], maxsize: int):
+        self.channels = tuple(channels)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.closed_reason: Optional[str] = None
+
+    def close(self, reason: str):
+        """Ends the stream. Pending messages are dropped so the sentinel always fits."""
+        if self.closed_reason is not None:
+            return
+        self.closed_reason = reason
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class NotificationHub:
+
+    def __init__(self, client_queue_size: int = HUB_CLIENT_QUEUE_SIZE):
+        self.client_queue_size = client_queue_size
+        self._subscriptions: Dict[str, Set[Subscription]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.connected = False
+        # counters reported by metrics()
+        self.messages_received = 0
+        self.messages_delivered = 0
+        self.messages_unrouted = 0
+        self.slow_disconnects = 0
+        self.reconnects = 0
+
+    # ---------- client side ----------
+
+    def subscribe(self, *channels: str) -> Subscription:
+        subscription = Subscription(channels, self.client_queue_size)
+        for channel in subscription.channels:
+            self._subscriptions.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        for channel in subscription.channels:
+            subscribers = self._subscriptions.get(channel)
+            if subscribers is None:
+                continue
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscriptions[channel]
+
+    # ---------- routing ----------
+
+    def route(self, channel: str, message: str):
+        """Copies a message into every subscriber queue of the channel (never blocks)."""
+        self.messages_received += 1
+        subscribers = self._subscriptions.get(channel)
+        if not subscribers:
+            self.messages_unrouted += 1
+            return
+
+        notification = (channel, *parse_published_notification(message))
+        for subscription in list(subscribers):
+            try:
+                subscription.queue.put_nowait(notification)
+                self.messages_delivered += 1
+            except asyncio.QueueFull:
+                # Backpressure: a client this far behind is disconnected (it can
+                # reconnect) rather than slowing down everyone else
+                self.slow_disconnects += 1
+                subscription.close("slow_consumer")
+                self.unsubscribe(subscription)
+
+    async def _listen(self):
+        """Reads the pattern subscription forever, reconnecting with backoff."""
+        backoff = 0.0
+        while True:
+            pubsub = None
+            try:
+                if redis_cache.redis_client is None:
+                    raise RedisError("Redis client is not available.")
+                pubsub = redis_cache.redis_client.pubsub(ignore_subscribe_messages=True)
+                await pubsub.psubscribe(*NOTIFICATION_PATTERNS)
+                self.connected = True
+                backoff = 0.0
+
+                async for message in pubsub.listen():
+                    if message.get("type") == "pmessage":
+                        self.route(message["channel"], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.reconnects += 1
+                backoff = min(max(backoff * 2, 0.5), _MAX_BACKOFF_SECONDS)
+                logger.warning("Notification hub lost Redis, resubscribing in %.1fs: %s", backoff, e)
+            finally:
+                self.connected = False
+                if pubsub is not None:
+                    try:
+                        await pubsub.aclose()
+                    except Exception:
+                        pass
+            await asyncio.sleep(backoff)
+
+    # ---------- lifecycle / metrics ----------
+
+    def start(self):
+        self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for subscription in {s for subscribers in self._subscriptions.values() for s in subscribers}:
+            subscription.close("shutdown")
+        self._subscriptions.clear()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def metrics(self) -> dict:
+        subscriptions = {s for subscribers in self._subscriptions.values() for s in subscribers}
+        queue_depths = [s.queue.qsize() for s in subscriptions]
+        return {
+            "redis_connected": self.connected,
+            "connections": len(queue_depths),
+            "channels": len(self._subscriptions),
+            "queue_capacity": self.client_queue_size,
+            "max_queue_depth": max(queue_depths, default=0),
+            "queued_messages": sum(queue_depths),
+            "messages_received": self.messages_received,
+            "messages_delivered": self.messages_delivered,
+            "messages_unrouted": self.messages_unrouted,
+            "slow_disconnects": self.slow_disconnects,
+            "reconnects": self.reconnects,
+        }
+
+
+notification_hub = NotificationHub()
+
+
+def start_notification_hub():
+    notification_hub.start()
+
+
+async def stop_notification_hub():
+    await notification_hub.stop()
@@ -0,0 +1,294 @@
+# src/notifications/service.py
+
+from sqlalchemy import select, update, delete, insert, func
+from sqlalchemy.orm import Session
+from redis.exceptions import (
+    RedisError, ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError,
+    BusyLoadingError, MasterDownError, NoScriptError, OutOfMemoryError, ReadOnlyError, TryAgainError,
+)
+from prometheus_client import Counter
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Sequence, Tuple
+import asyncio, json, logging, os, time
+
+from database.core import SessionLocal
+from models.r_model import NotificationOutbox as NotificationOutboxModel
+import cache.redis_client as redis_cache
+
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE', '200'))
+OUTBOX_POLL_SECONDS = float(os.environ.get('OUTBOX_POLL_SECONDS', '1.0'))
+# Only rejections of the notification itself count; Redis being down or busy is
+# retried forever with backoff. Rows that reach the cap are dead-lettered: left
+# unpublished, counted, and deleted after OUTBOX_RETENTION_HOURS like published rows.
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', '10'))
+OUTBOX_RETENTION_HOURS = int(os.environ.get('OUTBOX_RETENTION_HOURS', '24'))
+# Every published notification is also kept in a capped Redis Stream per channel
+# so reconnecting SSE clients can catch up (see read_missed_notifications)
+NOTIFICATION_STREAM_MAXLEN = int(os.environ.get('NOTIFICATION_STREAM_MAXLEN', '1000'))
+NOTIFICATION_STREAM_TTL_SECONDS = int(os.environ.get('NOTIFICATION_STREAM_TTL_SECONDS', '86400'))
+_MAX_BACKOFF_SECONDS = 30.0
+_CLEANUP_EVERY_CYCLES = 500
+
+# Failures of Redis itself rather than of a particular notification
+_UNAVAILABLE_ERRORS = (
+    RedisConnectionError, RedisTimeoutError, BusyLoadingError, MasterDownError,
+    NoScriptError, OutOfMemoryError, ReadOnlyError, TryAgainError, OSError,
+)
+
+OUTBOX_DEAD_LETTERED = Counter(
+    "notification_outbox_dead_lettered_total",
+    "Notifications given up on after OUTBOX_MAX_ATTEMPTS rejected publishes",
+)
+
+
+# ==========================================================
+# 🔹 Request side: write the event with the business change
+
+def enqueue_notification(db: Session, channel: str, payload: dict):
+    """
+    Adds a notification to the outbox as part of the caller's transaction.
+    It is only published if (and after) the caller commits.
+    """
+    db.add(NotificationOutboxModel(channel=channel, payload=json.dumps(payload)))
+
+
+def enqueue_notifications(db: Session, notifications: List[Tuple[str, dict]]):
+    """Like enqueue_notification, for many (channel, payload) pairs in one multi-row INSERT."""
+    if not notifications:
+        return
+    db.execute(insert(NotificationOutboxModel), [
+        {"channel": channel, "payload": json.dumps(payload)}
+        for channel, payload in notifications
+    ])
+
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_wakeup: Optional[asyncio.Event] = None
+_dispatcher_task: Optional[asyncio.Task] = None
+
+
+def wake_dispatcher():
+    """Call after committing outbox rows so they go out now instead of on the next poll."""
+    if _loop is not None and _wakeup is not None:
+        _loop.call_soon_threadsafe(_wakeup.set)
+
+
+# ==========================================================
+# 🔹 Background dispatcher
+
+def _claim_batch(db: Session) -> List[Tuple[int, str, str]]:
+    # SKIP LOCKED lets several workers drain the outbox without double publishing
+    rows = db.execute(
+        select(NotificationOutboxModel.id, NotificationOutboxModel.channel, NotificationOutboxModel.payload)
+        .where(
+            NotificationOutboxModel.published_at.is_(None),
+            NotificationOutboxModel.attempts < OUTBOX_MAX_ATTEMPTS,
+        )
+        .order_by(NotificationOutboxModel.id)
+        .limit(OUTBOX_BATCH_SIZE)
+        .with_for_update(skip_locked=True)
+    ).all()
+    return [tuple(row) for row in rows]
+
+
+def _mark_results(db: Session, published_ids: List[int], rejected_ids: List[int]) -> List[int]:
+    """Records one publish round in one transaction; returns the ids that just got dead-lettered."""
+    if published_ids:
+        db.execute(
+            update(NotificationOutboxModel)
+            .where(NotificationOutboxModel.id.in_(published_ids))
+            .values(published_at=func.now())
+        )
+    dead_ids = []
+    if rejected_ids:
+        rows = db.execute(
+            update(NotificationOutboxModel)
+            .where(NotificationOutboxModel.id.in_(rejected_ids))
+            .values(attempts=NotificationOutboxModel.attempts + 1)
+            .returning(NotificationOutboxModel.id, NotificationOutboxModel.attempts)
+        ).all()
+        dead_ids = [row_id for row_id, attempts in rows if attempts >= OUTBOX_MAX_ATTEMPTS]
+    db.commit()
+    return dead_ids
+
+
+def _delete_old_rows(db: Session):
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=OUTBOX_RETENTION_HOURS)
+    db.execute(delete(NotificationOutboxModel).where(NotificationOutboxModel.published_at < cutoff))
+    # Dead letters: never published, out of attempts, and past the same retention
+    db.execute(delete(NotificationOutboxModel).where(
+        NotificationOutboxModel.published_at.is_(None),
+        NotificationOutboxModel.attempts >= OUTBOX_MAX_ATTEMPTS,
+        NotificationOutboxModel.created_at < cutoff,
+    ))
+    db.commit()
+
+
+def notification_stream_key(channel: str) -> str:
+    return f"stream:{channel}"
+
+
+# XADD to the channel's capped stream, then PUBLISH "<stream id> <payload>" so
+# live subscribers learn the id too. KEYS[1] = stream key;
+# ARGV = channel, payload, maxlen, ttl seconds
+_APPEND_AND_PUBLISH_LUA = """
+local id = redis.call('XADD', KEYS[1], 'MAXLEN', '~', ARGV[3], '*', 'data', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+redis.call('PUBLISH', ARGV[1], id .. ' ' .. ARGV[2])
+return id
+"""
+
+
+async def _publish(redis_client, events: List[Tuple[int, str, str]]) -> List[int]:
+    """
+    Publishes `events` in one pipeline and returns the ids Redis rejected.
+    Raises when Redis itself is unavailable, so nothing is held against the rows.
+    """
+    append_and_publish = redis_client.register_script(_APPEND_AND_PUBLISH_LUA)
+    pipe = redis_client.pipeline(transaction=False)
+    for _, channel, payload in events:
+        await append_and_publish(
+            keys=[notification_stream_key(channel)],
+            args=[channel, payload, NOTIFICATION_STREAM_MAXLEN, NOTIFICATION_STREAM_TTL_SECONDS],
+            client=pipe,
+        )
+    results = await pipe.execute(raise_on_error=False)
+
+    rejected = []
+    for (event_id, channel, _), result in zip(events, results):
+        if isinstance(result, _UNAVAILABLE_ERRORS):
+            raise result
+        if isinstance(result, Exception):
+            logger.warning("Redis rejected notification %s on %s: %s", event_id, channel, result)
+            rejected.append(event_id)
+    return rejected
+
+
+def parse_published_notification(message: str) -> Tuple[str, str]:
+    """Splits a published "<stream id> <payload>" message into (id, payload)."""
+    event_id, _, payload = message.partition(" ")
+    return event_id, payload
+
+
+def stream_id_key(event_id: str) -> Tuple[int, int]:
+    """Sortable form of a Redis Stream id ("<ms>-<seq>")."""
+    ms, _, seq = event_id.partition("-")
+    return int(ms), int(seq or 0)
+
+
+async def read_missed_notifications(redis_client, channels: Sequence[str], last_event_id: str, limit: int) -> Tuple[List[Tuple[str, str, str]], bool]:
+    """
+    Returns the (channel, id, payload) notifications published on `channels` after
+    `last_event_id` (oldest first, at most `limit`), and whether some may have been
+    lost because a stream was trimmed or expired past that id.
+    """
+    pipe = redis_client.pipeline(transaction=False)
+    for channel in channels:
+        stream_key = notification_stream_key(channel)
+        pipe.xrange(stream_key, min=f"({last_event_id}", max="+", count=limit)
+        pipe.xrange(stream_key, min="-", max="+", count=1)
+        pipe.xlen(stream_key)
+    results = await pipe.execute()
+
+    last_key = stream_id_key(last_event_id)
+    # Older than the stream TTL: an empty stream may have expired with unseen events
+    expired = last_key[0] < (time.time() - NOTIFICATION_STREAM_TTL_SECONDS) * 1000
+
+    missed, gap = [], False
+    for channel, entries, oldest, length in zip(channels, results[0::3], results[1::3], results[2::3]):
+        missed.extend((channel, entry_id, fields["data"]) for entry_id, fields in entries)
+        if not oldest:
+            gap = gap or expired
+        elif stream_id_key(oldest[0][0]) > last_key:
+            # Older entries can only be gone if MAXLEN trimmed the stream (it never
+            # trims below MAXLEN) or the stream expired meanwhile
+            gap = gap or length >= NOTIFICATION_STREAM_MAXLEN or expired
+
+    # Stream ids are time based, so merging several channels keeps publish order
+    missed.sort(key=lambda notification: stream_id_key(notification[1]))
+    return missed[:limit], gap
+
+
+async def dispatch_once(db: Session) -> int:
+    """Publishes one batch of pending notifications. Returns how many went out."""
+    events = await asyncio.to_thread(_claim_batch, db)
+    if not events:
+        await asyncio.to_thread(db.rollback)
+        return 0
+
+    try:
+        if redis_cache.redis_client is None:
+            raise RedisError("Redis client is not available.")
+        rejected_ids = await _publish(redis_cache.redis_client, events)
+    except (RedisError, OSError) as e:
+        # Not the rows' fault: release them untouched and let the dispatcher back off
+        await asyncio.to_thread(db.rollback)
+        raise RedisError(f"Publishing {len(events)} notifications failed: {e}") from e
+
+    rejected = set(rejected_ids)
+    published_ids = [event_id for event_id, _, _ in events if event_id not in rejected]
+    dead_ids = await asyncio.to_thread(_mark_results, db, published_ids, rejected_ids)
+    if dead_ids:
+        OUTBOX_DEAD_LETTERED.inc(len(dead_ids))
+        logger.error("Giving up on notifications %s after %d attempts", dead_ids, OUTBOX_MAX_ATTEMPTS)
+    return len(published_ids)
+
+
+async def run_outbox_dispatcher():
+    """
+    Drains the outbox forever: publish full batches back to back, otherwise sleep
+    until woken by a request or the poll interval passes. While Redis is unavailable
+    it backs off exponentially (up to _MAX_BACKOFF_SECONDS) and keeps retrying;
+    a notification Redis rejects is retried up to OUTBOX_MAX_ATTEMPTS times.
+    """
+    backoff = 0.0
+    cycles = 0
+    db = SessionLocal()
+    try:
+        while True:
+            _wakeup.clear()
+            try:
+                published = await dispatch_once(db)
+                backoff = 0.0
+            except Exception as e:
+                published = 0
+                backoff = min(max(backoff * 2, 0.5), _MAX_BACKOFF_SECONDS)
+                logger.exception("Outbox dispatcher error, retrying in %.1fs", backoff)
+                await asyncio.to_thread(db.rollback)
+                await asyncio.sleep(backoff)
+                continue
+
+            cycles += 1
+            if cycles % _CLEANUP_EVERY_CYCLES == 0:
+                await asyncio.to_thread(_delete_old_rows, db)
+
+            if published < OUTBOX_BATCH_SIZE:
+                try:
+                    await asyncio.wait_for(_wakeup.wait(), timeout=OUTBOX_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+    finally:
+        db.close()
+
+
+def start_outbox_dispatcher() -> asyncio.Task:
+    global _loop, _wakeup, _dispatcher_task
+    _loop = asyncio.get_running_loop()
+    _wakeup = asyncio.Event()
+    _dispatcher_task = asyncio.create_task(run_outbox_dispatcher())
+    return _dispatcher_task
+
+
+async def stop_outbox_dispatcher():
+    global _loop, _dispatcher_task
+    if _dispatcher_task is not None:
+        _dispatcher_task.cancel()
+        try:
+            await _dispatcher_task
+        except asyncio.CancelledError:
+            pass
+    _loop = None
+    _dispatcher_task = None
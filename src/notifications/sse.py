@@ -0,0 +1,128 @@
+# src/notifications/sse.py
+
+from fastapi import Request
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+import asyncio, logging, os
+
+import cache.redis_client as redis_cache
+from observability.metrics import SSE_CONNECTIONS
+from .hub import notification_hub
+from .service import read_missed_notifications, stream_id_key
+
+logger = logging.getLogger(__name__)
+
+
+# Server-Sent Events on top of the worker's NotificationHub.
+# Every event carries its Redis Stream id as the SSE `id:`, so a reconnecting
+# client (EventSource sends Last-Event-ID) first gets what it missed.
+SSE_HEARTBEAT_SECONDS = float(os.environ.get('SSE_HEARTBEAT_SECONDS', '15'))
+SSE_RETRY_MS = int(os.environ.get('SSE_RETRY_MS', '3000'))
+SSE_MAX_REPLAY = int(os.environ.get('SSE_MAX_REPLAY', '500'))
+# Upper bound of events per frame in coalescing mode (?coalesce_ms=...)
+SSE_COALESCE_MAX_EVENTS = int(os.environ.get('SSE_COALESCE_MAX_EVENTS', '100'))
+
+# Stream ids look like "<ms>-<seq>"
+STREAM_ID_PATTERN = r"^\d+-\d+$"
+
+
+def _sse_event(event_id: str, data: str) -> str:
+    return f"id: {event_id}\ndata: {data}\n\n"
+
+
+def _sse_frames(notifications: List[Tuple[str, str]], coalesce: bool) -> str:
+    """One frame per notification, or a single frame whose data is a JSON array of them."""
+    if not coalesce:
+        return "".join(_sse_event(event_id, data) for event_id, data in notifications)
+    # The frame carries the last event's id, so a resume continues after the whole batch
+    return _sse_event(notifications[-1][0], "[" + ",".join(data for _, data in notifications) + "]")
+
+
+async def notification_event_stream(
+    request: Request,
+    channels: Sequence[str],
+    resume_id: Optional[str] = None,
+    coalesce_ms: Optional[int] = None,
+) -> AsyncIterator[str]:
+    """
+    Yields SSE text for `channels`: missed events after `resume_id` first (or an
+    `event: reset` if they can no longer all be replayed), then live events.
+    With `coalesce_ms`, events arriving within that window of the first one are
+    sent as one frame with a JSON array payload. Idle streams get keep-alive
+    comments; a stream the hub drops ends with `event: close`.
+    """
+    coalesce = coalesce_ms is not None
+    batch_size = SSE_COALESCE_MAX_EVENTS if coalesce else 1
+
+    # Subscribe BEFORE reading the backlog so nothing published in between is lost
+    subscription = notification_hub.subscribe(*channels)
+    stream_kind = channels[0].split(":", 1)[0] # user / restaurant / location
+    SSE_CONNECTIONS.labels(stream_kind).inc()
+    try:
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+
+        # 1. Catch up from the channels' streams. Ids are per stream (two streams
+        #    can both hand out "<ms>-0"), so what was sent is tracked per channel.
+        last_sent: Dict[str, Tuple[int, int]] = {}
+        if resume_id:
+            last_sent = {channel: stream_id_key(resume_id) for channel in channels}
+            try:
+                missed, gap = await read_missed_notifications(redis_cache.redis_client, channels, resume_id, SSE_MAX_REPLAY)
+            except Exception as e:
+                logger.warning("Could not replay notifications for %s: %s", channels, e)
+                missed, gap = [], True
+
+            if gap or len(missed) >= SSE_MAX_REPLAY:
+                yield "event: reset\ndata: {}\n\n"
+                missed = []
+            for start in range(0, len(missed), batch_size):
+                yield _sse_frames([(event_id, data) for _, event_id, data in missed[start:start + batch_size]], coalesce)
+            for channel, event_id, _ in missed:
+                last_sent[channel] = stream_id_key(event_id)
+
+        # 2. Live delivery (skipping what the replay already sent)
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                notification = await asyncio.wait_for(subscription.queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                # Idle: detect clients that went away and keep proxies from closing the stream
+                if await request.is_disconnected():
+                    break
+                yield ": keep-alive\n\n"
+                continue
+
+            closing = notification is None
+            batch = [] if closing else [notification]
+
+            # Coalescing: collect until the window (counted from the first event) closes
+            if coalesce and not closing:
+                deadline = loop.time() + coalesce_ms / 1000
+                while len(batch) < batch_size:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        notification = await asyncio.wait_for(subscription.queue.get(), timeout=remaining)
+                    except asyncio.TimeoutError:
+                        break
+                    if notification is None:
+                        closing = True
+                        break
+                    batch.append(notification)
+
+            fresh = []
+            for channel, event_id, data in batch:
+                event_key = stream_id_key(event_id)
+                if channel not in last_sent or event_key > last_sent[channel]:
+                    fresh.append((event_id, data))
+                    last_sent[channel] = event_key
+            if fresh:
+                yield _sse_frames(fresh, coalesce)
+
+            if closing:
+                # The hub closed this stream (slow consumer or shutdown); the client reconnects
+                yield f"event: close\ndata: {subscription.closed_reason}\n\n"
+                break
+    finally:
+        SSE_CONNECTIONS.labels(stream_kind).dec()
+        notification_hub.unsubscribe(subscription)
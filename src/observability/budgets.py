@@ -0,0 +1,153 @@
+# src/observability/budgets.py
+
+from prometheus_client import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, NamedTuple, Tuple
+import json, logging, os
+
+from .metrics import RequestStats, _request_stats, current_request_stats, route_label
+
+logger = logging.getLogger(__name__)
+
+
+# ==========================================================
+# 🔹 Query budgets
+#
+# The most SQL statements and Redis round trips (a pipeline / Lua call counts as
+# one) a route may use per request, independent of how many rows it returns.
+# A route that grows an N+1 blows its budget as soon as there are a few rows.
+#   QUERY_BUDGET_MODE=off     no checks
+#   QUERY_BUDGET_MODE=warn    log + query_budget_exceeded_total (default)
+#   QUERY_BUDGET_MODE=strict  the request fails with 500 (dev / CI, see
+#                             scripts/check_query_budgets.py); every response
+#                             carries an X-Query-Count header
+# The auth dependency's account lookup counts as one statement, a rate limit
+# check (services/rateLimitService.py) as one Redis round trip.
+
+class QueryBudget(NamedTuple):
+    sql: int
+    redis: int
+
+
+QUERY_BUDGETS: Dict[Tuple[str, str], QueryBudget] = {
+    # orders
+    ("POST", "/order/create/{restaurant_id}"): QueryBudget(sql=3, redis=3),
+    ("PATCH", "/order/restaurant/order/{order_id}/status"): QueryBudget(sql=4, redis=1),
+    ("PATCH", "/order/restaurant/orders/status"): QueryBudget(sql=3, redis=1),
+    ("PATCH", "/order/user/cancel/{order_id}"): QueryBudget(sql=4, redis=1),
+    ("GET", "/order/user/my-orders"): QueryBudget(sql=2, redis=0),
+    ("GET", "/order/restaurant/my-orders"): QueryBudget(sql=2, redis=0),
+    ("GET", "/order/restaurant/active-orders"): QueryBudget(sql=2, redis=3), # a rebuild reads, resets and merges
+    # restaurants / menus
+    ("GET", "/restaurant/get_all"): QueryBudget(sql=1, redis=2),
+    ("GET", "/restaurant/get_by_id/{restaurant_id}"): QueryBudget(sql=1, redis=0),
+    ("GET", "/restaurant/me"): QueryBudget(sql=1, redis=0),
+    ("GET", "/cuisine/cuisines_by_restaurant_id/{restaurant_id}"): QueryBudget(sql=2, redis=0),
+    ("GET", "/cuisine/categories"): QueryBudget(sql=1, redis=4), # a rebuild reads, locks, resets and merges
+}
+
+QUERY_BUDGET_MODE = os.environ.get('QUERY_BUDGET_MODE', 'warn').lower()
+
+QUERY_BUDGET_EXCEEDED = Counter(
+    "query_budget_exceeded_total", "Requests that used more SQL statements / Redis round trips than their budget",
+    ["route", "kind"],
+)
+
+
+def budget_violations(method: str, route: str, stats: RequestStats) -> List[str]:
+    """Human readable budget overruns of one request (empty when within budget or unbudgeted)."""
+    budget = QUERY_BUDGETS.get((method, route))
+    if budget is None:
+        return []
+    violations = []
+    if stats.statements > budget.sql:
+        violations.append(f"{stats.statements} SQL statements (budget {budget.sql})")
+    if stats.redis_round_trips > budget.redis:
+        violations.append(f"{stats.redis_round_trips} Redis round trips (budget {budget.redis})")
+    return violations
+
+
+@contextmanager
+def count_queries() -> Iterator[RequestStats]:
+    """
+    Counts SQL statements and Redis round trips made inside the block by
+    in-process code (service functions, scripts), e.g.
+        with count_queries() as stats:
+            await get_price_book(db, redis_client, restaurant_id)
+        assert stats.statements <= 1
+    HTTP requests are counted per request by the middleware instead.
+    """
+    stats = RequestStats()
+    token = _request_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _request_stats.reset(token)
+
+
+class QueryBudgetMiddleware:
+    """Must sit inside MetricsMiddleware, which sets up the per-request counters."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or QUERY_BUDGET_MODE == "off":
+            await self.app(scope, receive, send)
+            return
+
+        if QUERY_BUDGET_MODE != "strict":
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                self._check(scope)
+            return
+
+        # Strict: hold the response back until the handler is done, so an overrun
+        # can still turn it into an error (streaming responses pass straight through)
+        held = []
+        streaming = False
+
+        async def hold(message):
+            nonlocal streaming
+            if message["type"] == "http.response.start":
+                streaming = any(name == b"content-type" and value.startswith(b"text/event-stream")
+                                for name, value in message.get("headers", ()))
+            if streaming:
+                await send(message)
+            else:
+                held.append(message)
+
+        await self.app(scope, receive, hold)
+        violations = self._check(scope)
+
+        stats = current_request_stats()
+        if held and held[0]["type"] == "http.response.start" and stats is not None:
+            count = f"sql={stats.statements}; redis={stats.redis_round_trips}".encode()
+            held[0] = {**held[0], "headers": [*held[0].get("headers", ()), (b"x-query-count", count)]}
+
+        if violations and not streaming:
+            body = json.dumps({"detail": f"Query budget exceeded for {scope['method']} {route_label(scope)}: "
+                                         + ", ".join(violations)}).encode()
+            held = [
+                {"type": "http.response.start", "status": 500,
+                 "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+                             *[(name, value) for name, value in held[0]["headers"] if name == b"x-query-count"]]},
+                {"type": "http.response.body", "body": body},
+            ]
+        for message in held:
+            await send(message)
+
+    @staticmethod
+    def _check(scope) -> List[str]:
+        stats = current_request_stats()
+        if stats is None:
+            return []
+        route = route_label(scope)
+        violations = budget_violations(scope["method"], route, stats)
+        for violation in violations:
+            kind = "sql" if "SQL" in violation else "redis"
+            QUERY_BUDGET_EXCEEDED.labels(route, kind).inc()
+        if violations:
+            logger.warning("Query budget exceeded: %s %s: %s", scope["method"], route, ", ".join(violations))
+        return violations
@@ -0,0 +1,16 @@
+# src/observability/controller.py
+
+from fastapi import APIRouter, Response
+
+from .metrics import metrics_payload, METRICS_CONTENT_TYPE
+
+
+router = APIRouter(
+    tags=['observability']
+)
+
+
+@router.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus scrape endpoint."""
+    return Response(content=metrics_payload(), media_type=METRICS_CONTENT_TYPE)
@@ -0,0 +1,263 @@
+# src/observability/logs.py
+
+from prometheus_client import Counter
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+import copy, json, logging, os, queue, random, re, sys, uuid
+
+from .metrics import current_route
+
+
+# ==========================================================
+# 🔹 Logging pipeline
+#
+# Every record goes through a QueueHandler: the calling thread (usually the event
+# loop) only checks the level, applies sampling, stamps the request id and puts
+# the record on a bounded in-memory queue. A QueueListener thread redacts, turns
+# it into one JSON line and writes it. When the queue is full the record is
+# dropped and counted (log_records_dropped_total) instead of blocking.
+#   LOG_LEVEL          DEBUG / INFO (default) / WARNING / ...
+#   LOG_FORMAT         json (default) or text for local development
+#   LOG_SAMPLE_RATES   "restaurant.controller=0.1,auth=0.01": keep that share of
+#                      records below WARNING from those loggers (and their children)
+#   LOG_QUEUE_SIZE     records waiting for the writer before new ones are dropped
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json').lower()
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', '10000'))
+
+
+def _parse_sample_rates(value: str) -> Dict[str, float]:
+    rates = {}
+    for part in value.split(","):
+        name, _, rate = part.partition("=")
+        if name.strip() and rate.strip():
+            rates[name.strip()] = max(0.0, min(1.0, float(rate)))
+    return rates
+
+
+LOG_SAMPLE_RATES = _parse_sample_rates(os.environ.get('LOG_SAMPLE_RATES', ''))
+
+LOG_RECORDS_DROPPED = Counter("log_records_dropped_total", "Log records dropped because the log queue was full")
+LOG_RECORDS_SAMPLED_OUT = Counter("log_records_sampled_out_total", "Log records skipped by LOG_SAMPLE_RATES", ["logger"])
+
+
+# ==========================================================
+# 🔹 Request id
+
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+_REQUEST_ID_PATTERN = re.compile(r"^[\w.\-]{1,128}$")
+
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+class RequestIdMiddleware:
+    """Takes X-Request-ID from the client (or makes one), puts it on every log record and echoes it back."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", ()):
+            if name == b"x-request-id":
+                candidate = value.decode("latin-1")
+                if _REQUEST_ID_PATTERN.match(candidate):
+                    request_id = candidate
+                break
+        request_id = request_id or uuid.uuid4().hex
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", ()), (b"x-request-id", request_id.encode())]}
+            await send(message)
+
+        token = _request_id.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            _request_id.reset(token)
+
+
+# ==========================================================
+# 🔹 Calling-thread side: sample, stamp, enqueue
+
+class SamplingFilter(logging.Filter):
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._cache: Dict[str, float] = {}
+
+    def _rate(self, name: str) -> float:
+        rate = self._cache.get(name)
+        if rate is None:
+            # The most specific configured ancestor wins: "a.b" over "a"
+            rate, probe = 1.0, name
+            while probe:
+                if probe in self.rates:
+                    rate = self.rates[probe]
+                    break
+                probe = probe.rpartition(".")[0]
+            self._cache[name] = rate
+        return rate
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rate = self._rate(record.name)
+        if rate >= 1.0 or random.random() < rate:
+            return True
+        LOG_RECORDS_SAMPLED_OUT.labels(record.name).inc()
+        return False
+
+
+class RequestContextFilter(logging.Filter):
+    """Runs in the calling thread, where the request's context variables are still visible."""
+
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        record.route = current_route()
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+
+    def prepare(self, record):
+        # Only merge the message; tracebacks are formatted by the writer thread
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+# ==========================================================
+# 🔹 Writer side: redact, format, write
+
+_REDACTED = "[REDACTED]"
+_SENSITIVE_KEYS = re.compile(r"pass(word)?|secret|token|authorization|api[_-]?key|cookie", re.IGNORECASE)
+_REDACTIONS = [
+    # JWTs (access tokens) wherever they appear
+    (re.compile(r"eyJ[\w-]{5,}\.[\w-]{5,}\.[\w-]{5,}"), _REDACTED),
+    (re.compile(r"(?i)\b(bearer)\s+[\w\-.~+/=]+"), r"\1 " + _REDACTED),
+    # key=value / "key": "value" pairs with a sensitive key
+    (re.compile(r"(?i)\b(password|passwd|secret|token|access_token|api_key|authorization)(\"?\s*[:=]\s*\"?)[^\s\"',&]+"),
+     r"\1\2" + _REDACTED),
+    # Emails: keep the domain, mask the mailbox
+    (re.compile(r"\b([\w.+-])[\w.+-]*@([\w-]+\.[\w.-]+)\b"), r"\1***@\2"),
+]
+_STANDARD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id", "route"}
+
+
+def redact(text: str) -> str:
+    for pattern, replacement in _REDACTIONS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def _redact_value(key: str, value):
+    if _SENSITIVE_KEYS.search(key):
+        return _REDACTED
+    if isinstance(value, str):
+        return redact(value)
+    return value
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra={...}` fields become top-level keys."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": redact(record.getMessage()),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        if getattr(record, "route", None):
+            entry["route"] = record.route
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = _redact_value(key, value)
+        if record.exc_info:
+            entry["exc"] = redact(self.formatException(record.exc_info))
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s")
+
+    def format(self, record):
+        line = redact(super().format(record))
+        request_id = getattr(record, "request_id", None)
+        return f"{line} [{request_id}]" if request_id else line
+
+
+# ==========================================================
+# 🔹 Setup
+
+# How long shutdown waits for the writer to make room for its stop marker
+_STOP_TIMEOUT_SECONDS = 5.0
+
+
+class DrainingQueueListener(QueueListener):
+
+    def enqueue_sentinel(self):
+        # The stock put_nowait raises queue.Full when the bounded queue is full at
+        # shutdown; the writer thread is still draining it, so wait for a slot
+        self.queue.put(self._sentinel, timeout=_STOP_TIMEOUT_SECONDS)
+
+
+_listener: Optional[QueueListener] = None
+
+
+def configure_logging():
+    """Routes the root logger through the queue; uvicorn's own loggers are left as they are."""
+    global _listener
+    if _listener is not None:
+        return
+
+    writer = logging.StreamHandler(sys.stdout)
+    writer.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    handler = NonBlockingQueueHandler(log_queue)
+    handler.addFilter(SamplingFilter(LOG_SAMPLE_RATES))
+    handler.addFilter(RequestContextFilter())
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(LOG_LEVEL)
+
+    _listener = DrainingQueueListener(log_queue, writer, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging():
+    """Writes out what is still queued (called on shutdown)."""
+    global _listener
+    if _listener is not None:
+        try:
+            _listener.stop()
+        except queue.Full:
+            # The writer made no progress for _STOP_TIMEOUT_SECONDS (stuck stdout);
+            # give up on the backlog rather than hang shutdown
+            sys.stderr.write("Log writer stalled at shutdown; queued log records were dropped\n")
+        _listener = None
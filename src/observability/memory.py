@@ -0,0 +1,107 @@
+# src/observability/memory.py
+
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import List, Optional
+import os, threading, tracemalloc
+
+
+# ==========================================================
+# 🔹 tracemalloc snapshots
+#
+# For chasing worker memory growth (a token blacklist that only grows, SSE
+# generators that are never closed, ...): start tracing, take a snapshot, let
+# traffic run, take another, diff the two. Tracing costs CPU and memory, so it
+# is off until an admin starts it (or TRACEMALLOC_FRAMES is set at boot).
+
+MEMORY_SNAPSHOTS_KEEP = int(os.environ.get('MEMORY_SNAPSHOTS_KEEP', '4'))
+
+# Allocations made by tracemalloc itself and the import system are noise
+_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+def _stat_dict(stat) -> dict:
+    frames = [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback]
+    entry = {"where": frames[0] if frames else "?", "size_kb": round(stat.size / 1024, 1), "count": stat.count}
+    if len(frames) > 1:
+        entry["traceback"] = frames
+    if hasattr(stat, "size_diff"):
+        entry["size_diff_kb"] = round(stat.size_diff / 1024, 1)
+        entry["count_diff"] = stat.count_diff
+    return entry
+
+
+class MemorySnapshots:
+
+    def __init__(self):
+        self._snapshots = OrderedDict() # id -> (taken_at, Snapshot)
+        self._lock = threading.Lock()
+        self._next_id = 1
+
+    def start(self, frames: int) -> dict:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        return self.status()
+
+    def stop(self) -> dict:
+        # Snapshots are useless without tracing and hold a lot of memory themselves
+        tracemalloc.stop()
+        with self._lock:
+            self._snapshots.clear()
+        return self.status()
+
+    def status(self) -> dict:
+        current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        with self._lock:
+            snapshots = [{"id": snapshot_id, "taken_at": taken_at} for snapshot_id, (taken_at, _) in self._snapshots.items()]
+        return {
+            "tracing": tracemalloc.is_tracing(),
+            "frames": tracemalloc.get_traceback_limit(),
+            "traced_kb": round(current / 1024, 1),
+            "peak_kb": round(peak / 1024, 1),
+            "snapshots": snapshots,
+        }
+
+    def take(self, group_by: str, limit: int) -> Optional[dict]:
+        """None when tracing is off."""
+        if not tracemalloc.is_tracing():
+            return None
+        snapshot = tracemalloc.take_snapshot().filter_traces(_FILTERS)
+        taken_at = datetime.now(timezone.utc).isoformat()
+        with self._lock:
+            snapshot_id = self._next_id
+            self._next_id += 1
+            self._snapshots[snapshot_id] = (taken_at, snapshot)
+            while len(self._snapshots) > MEMORY_SNAPSHOTS_KEEP:
+                self._snapshots.popitem(last=False)
+        stats = snapshot.statistics(group_by)
+        return {
+            "id": snapshot_id,
+            "taken_at": taken_at,
+            "total_kb": round(sum(stat.size for stat in stats) / 1024, 1),
+            "top": [_stat_dict(stat) for stat in stats[:limit]],
+        }
+
+    def get(self, snapshot_id: int):
+        with self._lock:
+            entry = self._snapshots.get(snapshot_id)
+        return entry[1] if entry else None
+
+    def diff(self, snapshot_id: int, base_id: int, group_by: str, limit: int) -> Optional[List[dict]]:
+        """Biggest growth from `base_id` to `snapshot_id` first; None if either snapshot is gone."""
+        snapshot, base = self.get(snapshot_id), self.get(base_id)
+        if snapshot is None or base is None:
+            return None
+        return [_stat_dict(stat) for stat in snapshot.compare_to(base, group_by)[:limit]]
+
+
+memory_snapshots = MemorySnapshots()
+
+# Trace from boot, e.g. to see what a leak allocated before anyone looked
+if int(os.environ.get('TRACEMALLOC_FRAMES', '0')) > 0:
+    memory_snapshots.start(int(os.environ['TRACEMALLOC_FRAMES']))
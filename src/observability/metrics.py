@@ -0,0 +1,256 @@
+# src/observability/metrics.py
+
+from prometheus_client import (Counter, Gauge, Histogram, CollectorRegistry, REGISTRY,
+                               generate_latest, multiprocess, CONTENT_TYPE_LATEST)
+from prometheus_client.core import GaugeMetricFamily, CounterMetricFamily
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Optional
+import os
+
+
+# ==========================================================
+# 🔹 Metric definitions
+#
+# Route labels use the route template (/order/create/{restaurant_id}), never the
+# raw path, so label cardinality stays bounded.
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Time to handle a request (SSE streams excluded)",
+    ["method", "route", "status"], buckets=_LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Requests currently being handled (including open streams)",
+    multiprocess_mode="livesum",
+)
+DB_STATEMENTS_PER_REQUEST = Histogram(
+    "db_statements_per_request", "SQL statements executed while handling a request",
+    ["route"], buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "db_time_per_request_seconds", "Time spent in SQL statements while handling a request",
+    ["route"], buckets=_LATENCY_BUCKETS,
+)
+DB_STATEMENT_DURATION = Histogram(
+    "db_statement_duration_seconds", "Duration of single SQL statements",
+    buckets=_FAST_BUCKETS,
+)
+REDIS_COMMAND_DURATION = Histogram(
+    "redis_command_duration_seconds", "Round trip time of Redis commands (pipelines count as one)",
+    ["command"], buckets=_FAST_BUCKETS,
+)
+REDIS_COMMAND_ERRORS = Counter(
+    "redis_command_errors_total", "Redis commands that raised", ["command"],
+)
+SSE_CONNECTIONS = Gauge(
+    "sse_connections", "Open Server-Sent Events streams", ["stream"],
+    multiprocess_mode="livesum",
+)
+
+
+# ==========================================================
+# 🔹 Per-request SQL / Redis accounting
+#
+# The middleware puts a RequestStats in a context variable; engine events and the
+# Redis wrapper below add to whatever RequestStats is current. Threadpool calls (sync endpoints/dependencies,
+# asyncio.to_thread) run in a copy of the context, so they see the same object.
+
+class RequestStats:
+    __slots__ = ("statements", "db_seconds", "redis_round_trips", "scope")
+
+    def __init__(self, scope=None):
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.redis_round_trips = 0
+        # The ASGI scope; the router adds the matched route to it in place
+        self.scope = scope
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _request_stats.get()
+
+
+def current_route() -> Optional[str]:
+    """"GET /order/user/my-orders" for the request being handled, None outside requests."""
+    stats = _request_stats.get()
+    if stats is None or stats.scope is None:
+        return None
+    return f"{stats.scope['method']} {route_label(stats.scope)}"
+
+
+def _count_redis_round_trip():
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.redis_round_trips += 1
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = perf_counter() - conn.info["query_start_time"].pop()
+    DB_STATEMENT_DURATION.observe(elapsed)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_seconds += elapsed
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    starts = exception_context.connection.info.get("query_start_time") if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+
+def instrument_engine(engine: Engine):
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+# ==========================================================
+# 🔹 Redis timing
+
+def instrument_redis_client(redis_client):
+    """Times every command (and every pipeline execute) sent through `redis_client`."""
+    if redis_client is None or getattr(redis_client, "_metrics_instrumented", False):
+        return
+
+    execute_command = redis_client.execute_command
+    make_pipeline = redis_client.pipeline
+
+    async def timed_execute_command(*args, **options):
+        command = str(args[0]).upper() if args else "UNKNOWN"
+        _count_redis_round_trip()
+        started = perf_counter()
+        try:
+            return await execute_command(*args, **options)
+        except Exception:
+            REDIS_COMMAND_ERRORS.labels(command).inc()
+            raise
+        finally:
+            REDIS_COMMAND_DURATION.labels(command).observe(perf_counter() - started)
+
+    def timed_pipeline(*args, **kwargs):
+        pipe = make_pipeline(*args, **kwargs)
+        execute = pipe.execute
+
+        async def timed_execute(*execute_args, **execute_kwargs):
+            _count_redis_round_trip()
+            started = perf_counter()
+            try:
+                return await execute(*execute_args, **execute_kwargs)
+            except Exception:
+                REDIS_COMMAND_ERRORS.labels("PIPELINE").inc()
+                raise
+            finally:
+                REDIS_COMMAND_DURATION.labels("PIPELINE").observe(perf_counter() - started)
+
+        pipe.execute = timed_execute
+        return pipe
+
+    redis_client.execute_command = timed_execute_command
+    redis_client.pipeline = timed_pipeline
+    redis_client._metrics_instrumented = True
+
+
+# ==========================================================
+# 🔹 Request middleware (plain ASGI: no extra task or body buffering per request)
+
+def route_label(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        streaming = False
+
+        async def send_with_status(message):
+            nonlocal status_code, streaming
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                for name, value in message.get("headers", ()):
+                    if name == b"content-type" and value.startswith(b"text/event-stream"):
+                        streaming = True
+            await send(message)
+
+        stats = RequestStats(scope)
+        token = _request_stats.set(stats)
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        started = perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = perf_counter() - started
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            _request_stats.reset(token)
+
+            route = route_label(scope)
+            if not streaming:
+                HTTP_REQUEST_DURATION.labels(scope["method"], route, str(status_code)).observe(elapsed)
+            DB_STATEMENTS_PER_REQUEST.labels(route).observe(stats.statements)
+            DB_TIME_PER_REQUEST.labels(route).observe(stats.db_seconds)
+
+
+# ==========================================================
+# 🔹 Exposition
+
+class NotificationHubCollector:
+    """Reports the worker's NotificationHub counters at scrape time."""
+
+    def __init__(self, hub):
+        self.hub = hub
+
+    def collect(self):
+        metrics = self.hub.metrics()
+        for name in ("connections", "channels", "max_queue_depth", "queued_messages"):
+            yield GaugeMetricFamily(f"notification_hub_{name}", f"NotificationHub {name.replace('_', ' ')}", value=metrics[name])
+        yield GaugeMetricFamily("notification_hub_redis_connected", "1 while the hub's pattern subscription is up",
+                                value=int(metrics["redis_connected"]))
+        for name in ("messages_received", "messages_delivered", "messages_unrouted", "slow_disconnects", "reconnects"):
+            yield CounterMetricFamily(f"notification_hub_{name}", f"NotificationHub {name.replace('_', ' ')}", value=metrics[name])
+
+
+_hub_collector_registered = False
+
+
+def register_hub_collector(hub):
+    global _hub_collector_registered
+    if not _hub_collector_registered:
+        REGISTRY.register(NotificationHubCollector(hub))
+        _hub_collector_registered = True
+
+
+def metrics_payload() -> bytes:
+    # Under several worker processes, set PROMETHEUS_MULTIPROC_DIR so every worker's
+    # samples are aggregated (per-process collectors like the hub's are then skipped)
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+METRICS_CONTENT_TYPE = CONTENT_TYPE_LATEST
@@ -0,0 +1,202 @@
+# src/observability/profiling.py
+
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import Optional
+import asyncio, inspect, logging, os, sys, threading, uuid
+
+from admin.service import is_admin_token
+from .metrics import route_label
+
+logger = logging.getLogger(__name__)
+
+
+# ==========================================================
+# 🔹 On-demand request profiling
+#
+# A request sent with `X-Profile: 1` and a valid X-Admin-Token is sampled by a
+# background thread every PROFILE_INTERVAL_MS. The response carries an
+# X-Profile-Id; GET /admin/profiles/{id} returns the samples as collapsed stacks
+# ("frame;frame;frame count" lines), which speedscope and flamegraph.pl open as is.
+#
+# Only the request's own work is sampled: the event loop thread while the
+# request's task is the one running, and worker threads whose stack is inside
+# the request's (sync) endpoint, e.g. GET /restaurant/analytics.
+
+# The sampler needs the GIL to look, so intervals below sys.getswitchinterval() (5 ms) add little
+PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', '5'))
+PROFILE_MAX_SECONDS = float(os.environ.get('PROFILE_MAX_SECONDS', '30'))
+PROFILE_MAX_CONCURRENT = int(os.environ.get('PROFILE_MAX_CONCURRENT', '2'))
+# Finished profiles kept per worker
+PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', '20'))
+
+_SRC_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    if filename.startswith(_SRC_ROOT):
+        filename = os.path.relpath(filename, _SRC_ROOT)
+    else:
+        # site-packages/starlette/routing.py -> starlette/routing.py
+        marker = "site-packages" + os.sep
+        if marker in filename:
+            filename = filename.split(marker, 1)[1]
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ",")
+
+
+def _collapse(frame) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+def _stack_has(frame, code) -> bool:
+    while frame is not None:
+        if frame.f_code is code:
+            return True
+        frame = frame.f_back
+    return False
+
+
+class RequestProfile:
+
+    def __init__(self, scope, loop, task):
+        self.id = uuid.uuid4().hex[:12]
+        self.scope = scope
+        self.loop = loop
+        self.task = task
+        self.loop_thread_id = threading.get_ident()
+        self.started_at = datetime.now(timezone.utc)
+        self.samples = Counter()
+        self.sample_count = 0
+        self.duration_ms = 0.0
+        self.status_code = None
+        self._started = 0.0
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"profiler-{self.id}", daemon=True)
+
+    def start(self):
+        self._started = perf_counter()
+        self._thread.start()
+
+    def stop(self, status_code: Optional[int]):
+        self.status_code = status_code
+        self.duration_ms = round((perf_counter() - self._started) * 1000, 2)
+        self._done.set()
+        self._thread.join()
+
+    def _endpoint_code(self):
+        endpoint = self.scope.get("endpoint")
+        if endpoint is None or inspect.iscoroutinefunction(endpoint):
+            return None
+        return getattr(inspect.unwrap(endpoint), "__code__", None)
+
+    def _run(self):
+        interval = PROFILE_INTERVAL_MS / 1000
+        deadline = perf_counter() + PROFILE_MAX_SECONDS
+        own_thread = threading.get_ident()
+        while not self._done.wait(interval) and perf_counter() < deadline:
+            frames = sys._current_frames()
+            endpoint_code = self._endpoint_code()
+            request_task_running = asyncio.current_task(self.loop) is self.task
+            if self._done.is_set():
+                # The request finished while we looked; this would only show the middleware joining us
+                break
+            for thread_id, frame in frames.items():
+                if thread_id == own_thread:
+                    continue
+                if thread_id == self.loop_thread_id:
+                    if not request_task_running:
+                        continue
+                elif endpoint_code is None or not _stack_has(frame, endpoint_code):
+                    continue
+                self.samples[_collapse(frame)] += 1
+                self.sample_count += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "route": f"{self.scope['method']} {route_label(self.scope)}",
+            "path": self.scope.get("path"),
+            "status": self.status_code,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": self.duration_ms,
+            "interval_ms": PROFILE_INTERVAL_MS,
+            "samples": self.sample_count,
+        }
+
+
+class ProfileStore:
+
+    def __init__(self):
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+        self.running = 0
+
+    def add(self, profile: RequestProfile):
+        with self._lock:
+            self._profiles[profile.id] = profile
+            while len(self._profiles) > PROFILE_KEEP:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[RequestProfile]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def list(self):
+        with self._lock:
+            return [profile.summary() for profile in reversed(self._profiles.values())]
+
+
+profile_store = ProfileStore()
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class ProfilingMiddleware:
+    """Profiles requests sent with `X-Profile: 1` by an admin; everything else passes straight through."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or _header(scope, b"x-profile") not in ("1", "true"):
+            await self.app(scope, receive, send)
+            return
+        if not is_admin_token(_header(scope, b"x-admin-token")) or profile_store.running >= PROFILE_MAX_CONCURRENT:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope, asyncio.get_running_loop(), asyncio.current_task())
+        status_code = None
+
+        async def send_with_profile_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message = {**message, "headers": [*message.get("headers", ()), (b"x-profile-id", profile.id.encode())]}
+            await send(message)
+
+        profile_store.running += 1
+        profile.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profile_store.running -= 1
+            # Joining the sampler takes at most one interval
+            profile.stop(status_code)
+            profile_store.add(profile)
+            logger.info("Profiled %s %s: %d samples in %s ms (id %s)", scope["method"], route_label(scope),
+                        profile.sample_count, profile.duration_ms, profile.id)
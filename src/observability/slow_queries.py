@@ -0,0 +1,201 @@
+# src/observability/slow_queries.py
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from time import perf_counter
+from typing import List, Optional
+import json, logging, os, random, threading
+
+from .metrics import current_route
+
+logger = logging.getLogger(__name__)
+
+
+# ==========================================================
+# 🔹 Slow-query log
+#
+# Statements slower than SLOW_QUERY_MS are kept in an in-memory ring buffer
+# (GET /admin/slow-queries) and appended to a rotating JSONL file, with the route
+# that ran them and the shape (names + types, never values) of their parameters.
+# A sampled fraction of slow SELECTs is re-run as EXPLAIN (ANALYZE, BUFFERS) on a
+# background thread, so the request that was slow never waits for the plan.
+
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '200'))
+SLOW_QUERY_BUFFER_SIZE = int(os.environ.get('SLOW_QUERY_BUFFER_SIZE', '200'))
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE = float(os.environ.get('SLOW_QUERY_EXPLAIN_SAMPLE_RATE', '0.1'))
+SLOW_QUERY_EXPLAIN_TIMEOUT_MS = int(os.environ.get('SLOW_QUERY_EXPLAIN_TIMEOUT_MS', '5000'))
+# At most this many plans waiting / running at once; slow entries beyond it are logged without a plan
+SLOW_QUERY_EXPLAIN_MAX_PENDING = int(os.environ.get('SLOW_QUERY_EXPLAIN_MAX_PENDING', '4'))
+# Empty: ring buffer only
+SLOW_QUERY_LOG_FILE = os.environ.get('SLOW_QUERY_LOG_FILE', '')
+SLOW_QUERY_LOG_MAX_BYTES = int(os.environ.get('SLOW_QUERY_LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+SLOW_QUERY_LOG_BACKUPS = int(os.environ.get('SLOW_QUERY_LOG_BACKUPS', '5'))
+
+_MAX_STATEMENT_CHARS = 4000
+_MAX_PARAM_NAMES = 30
+
+
+def parameter_shape(parameters, executemany: bool):
+    """{"email_1": "str", "id_1": "int"} (first row + row count for executemany); values are dropped."""
+    if executemany and isinstance(parameters, (list, tuple)):
+        rows = len(parameters)
+        first = parameter_shape(parameters[0], False) if rows else None
+        return {"rows": rows, "row": first}
+    if isinstance(parameters, dict):
+        names = list(parameters)
+        shape = {name: type(parameters[name]).__name__ for name in names[:_MAX_PARAM_NAMES]}
+        if len(names) > _MAX_PARAM_NAMES:
+            shape["..."] = f"{len(names) - _MAX_PARAM_NAMES} more"
+        return shape
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters[:_MAX_PARAM_NAMES]]
+    return None
+
+
+def _explainable(statement: str, executemany: bool) -> bool:
+    # EXPLAIN ANALYZE executes the statement: only plain reads, never writes or row locks
+    head = statement.lstrip().upper()
+    return (not executemany and (head.startswith("SELECT") or head.startswith("WITH"))
+            and "FOR UPDATE" not in head and "FOR SHARE" not in head
+            and " INSERT " not in head and " UPDATE " not in head and " DELETE " not in head)
+
+
+class SlowQueryLog:
+
+    def __init__(self):
+        self.entries = deque(maxlen=SLOW_QUERY_BUFFER_SIZE)
+        self.engine: Optional[Engine] = None
+        self._lock = threading.Lock()
+        self._pending_explains = 0
+        # One thread does the plans and the file writes, off the request's path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-log")
+        self._file_logger = None
+        if SLOW_QUERY_LOG_FILE:
+            handler = RotatingFileHandler(SLOW_QUERY_LOG_FILE, maxBytes=SLOW_QUERY_LOG_MAX_BYTES,
+                                          backupCount=SLOW_QUERY_LOG_BACKUPS, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._file_logger = logging.getLogger("nomadnourish.slow_queries")
+            self._file_logger.setLevel(logging.INFO)
+            self._file_logger.propagate = False
+            self._file_logger.addHandler(handler)
+
+    # --- engine hooks ---
+
+    def install(self, engine: Engine):
+        if event.contains(engine, "before_cursor_execute", self._before_cursor_execute):
+            return
+        self.engine = engine
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(engine, "handle_error", self._handle_error)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("slow_query_start_time", []).append(perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (perf_counter() - conn.info["slow_query_start_time"].pop()) * 1000
+        if elapsed_ms < SLOW_QUERY_MS or conn.info.get("slow_query_explaining"):
+            return
+        self.record(statement, parameters, executemany, elapsed_ms, current_route())
+
+    def _handle_error(self, exception_context):
+        starts = exception_context.connection.info.get("slow_query_start_time") if exception_context.connection else None
+        if starts:
+            starts.pop()
+
+    # --- recording ---
+
+    def record(self, statement: str, parameters, executemany: bool, elapsed_ms: float, route: Optional[str]):
+        entry = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": round(elapsed_ms, 2),
+            "route": route or "background",
+            "statement": statement[:_MAX_STATEMENT_CHARS],
+            "parameters": parameter_shape(parameters, executemany),
+            "explain": None,
+        }
+
+        explain = (
+            self.engine is not None
+            and self.engine.dialect.name == "postgresql"
+            and random.random() < SLOW_QUERY_EXPLAIN_SAMPLE_RATE
+            and _explainable(statement, executemany)
+        )
+        with self._lock:
+            if explain and self._pending_explains >= SLOW_QUERY_EXPLAIN_MAX_PENDING:
+                explain = False
+            if explain:
+                self._pending_explains += 1
+                entry["explain"] = "pending"
+            self.entries.append(entry)
+
+        logger.warning("Slow query (%s ms) in %s: %s", entry["duration_ms"], entry["route"], " ".join(statement[:200].split()))
+        try:
+            if explain:
+                # The parameters are only kept for the plan; the entry itself never holds values
+                self._executor.submit(self._explain_and_write, entry, statement, parameters)
+            elif self._file_logger is not None:
+                self._executor.submit(self._write, entry)
+        except RuntimeError:
+            # Executor already shut down (interpreter exit)
+            pass
+
+    def _explain_and_write(self, entry: dict, statement: str, parameters):
+        try:
+            entry["explain"] = self._explain(statement, parameters)
+        except Exception as e:
+            entry["explain"] = {"error": str(e).splitlines()[0][:500]}
+        finally:
+            with self._lock:
+                self._pending_explains -= 1
+        self._write(entry)
+
+    def _explain(self, statement: str, parameters):
+        # Own connection, read-only transaction that is always rolled back, bounded runtime
+        with self.engine.connect() as conn:
+            conn.info["slow_query_explaining"] = True
+            try:
+                conn.execute(text("SET TRANSACTION READ ONLY"))
+                conn.execute(text(f"SET LOCAL statement_timeout = {SLOW_QUERY_EXPLAIN_TIMEOUT_MS}"))
+                plan = conn.exec_driver_sql(
+                    "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement, parameters
+                ).scalar()
+            finally:
+                conn.rollback()
+                conn.info.pop("slow_query_explaining", None)
+        return plan if not isinstance(plan, str) else json.loads(plan)
+
+    def _write(self, entry: dict):
+        if self._file_logger is None:
+            return
+        try:
+            self._file_logger.info(json.dumps(entry, default=str))
+        except Exception as e:
+            logger.warning("Could not write the slow query log: %s", e)
+
+    # --- reading ---
+
+    def recent(self, limit: int = 50, route: Optional[str] = None, min_ms: float = 0) -> List[dict]:
+        """Newest first."""
+        with self._lock:
+            entries = list(self.entries)
+        matching = [
+            entry for entry in reversed(entries)
+            if entry["duration_ms"] >= min_ms and (route is None or route in entry["route"])
+        ]
+        return matching[:limit]
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+
+slow_query_log = SlowQueryLog()
+
+
+def install_slow_query_log(engine: Engine):
+    slow_query_log.install(engine)
@@ -0,0 +1,203 @@
+# src/orders/board.py
+
+from sqlalchemy.orm import Session, joinedload
+from datetime import datetime
+from typing import List, Optional
+import asyncio, logging, os
+
+import cache.redis_client as redis_cache
+from models.r_model import Order as OrderModel, OrderItem as OrderItemModel
+from models.r_schema import OrderForRestaurantResponse
+
+logger = logging.getLogger(__name__)
+
+
+# ==========================================================
+# 🔹 Active-orders board (what kitchen screens poll)
+#
+# Per restaurant, Redis holds:
+#   board:restaurant:<id>           ZSET  order id -> order_date (epoch seconds)
+#   board:restaurant:<id>:orders    HASH  order id -> serialized OrderForRestaurantResponse
+#   board:restaurant:<id>:versions  HASH  order id -> orders.version last written
+#   board:restaurant:<id>:built     marker; the board is only trusted while it exists
+#   board:restaurant:<id>:gen       rebuild generation
+# Writes carry the order's version and are ignored if an equal/newer version was
+# already applied, so late or reordered writes cannot bring back a stale status.
+# They apply whether or not the board is built, so a write landing while a reader
+# rebuilds is not lost.
+# A missing marker means "rebuild from Postgres"; it expires after BOARD_TTL_SECONDS
+# so a write lost to a crash heals on its own. A rebuild first clears the board and
+# bumps the generation, then merges its snapshot per order, keeping whichever
+# version is higher. If another rebuild or an invalidation bumped the generation
+# in the meantime, the snapshot may be older than that and is not merged.
+
+ACTIVE_ORDER_STATUSES = ("Pending", "Preparing", "Ready")
+BOARD_TTL_SECONDS = int(os.environ.get('BOARD_TTL_SECONDS', '900'))
+
+
+def _board_keys(restaurant_id: int) -> List[str]:
+    base = f"board:restaurant:{restaurant_id}"
+    return [base, f"{base}:orders", f"{base}:versions", f"{base}:built", f"{base}:gen"]
+
+
+# KEYS = _board_keys(); ARGV = order id, version, payload ('' = remove), score, ttl ms
+# Without the marker the write is still recorded (with a fresh TTL) for a rebuild to merge
+_APPLY_LUA = """
+local ttl = redis.call('PTTL', KEYS[4])
+if ttl <= 0 then ttl = tonumber(ARGV[5]) end
+local current = tonumber(redis.call('HGET', KEYS[3], ARGV[1]) or '0')
+if tonumber(ARGV[2]) <= current then return 0 end
+redis.call('HSET', KEYS[3], ARGV[1], ARGV[2])
+if ARGV[3] == '' then
+    redis.call('HDEL', KEYS[2], ARGV[1])
+    redis.call('ZREM', KEYS[1], ARGV[1])
+else
+    redis.call('HSET', KEYS[2], ARGV[1], ARGV[3])
+    redis.call('ZADD', KEYS[1], ARGV[4], ARGV[1])
+end
+for i = 1, 3 do
+    if redis.call('EXISTS', KEYS[i]) == 1 then redis.call('PEXPIRE', KEYS[i], ttl) end
+end
+return 1
+"""
+
+# KEYS = _board_keys(); ARGV = ttl seconds. Empties the board and returns the new
+# generation, which makes any rebuild still in flight discard its snapshot.
+_RESET_LUA = """
+redis.call('DEL', KEYS[1], KEYS[2], KEYS[3], KEYS[4])
+local generation = redis.call('INCR', KEYS[5])
+redis.call('EXPIRE', KEYS[5], ARGV[1])
+return generation
+"""
+
+# KEYS = _board_keys(); ARGV = generation, ttl seconds, then order id, version,
+# payload, score for every active order. Returns 0 if the generation moved on.
+_MERGE_LUA = """
+if redis.call('GET', KEYS[5]) ~= ARGV[1] then return 0 end
+for i = 3, #ARGV, 4 do
+    local current = tonumber(redis.call('HGET', KEYS[3], ARGV[i]) or '0')
+    if tonumber(ARGV[i + 1]) > current then
+        redis.call('HSET', KEYS[3], ARGV[i], ARGV[i + 1])
+        redis.call('HSET', KEYS[2], ARGV[i], ARGV[i + 2])
+        redis.call('ZADD', KEYS[1], ARGV[i + 3], ARGV[i])
+    end
+end
+redis.call('SET', KEYS[4], 1, 'EX', ARGV[2])
+for i = 1, 3 do
+    if redis.call('EXISTS', KEYS[i]) == 1 then redis.call('EXPIRE', KEYS[i], ARGV[2]) end
+end
+return 1
+"""
+
+# KEYS = _board_keys(); returns nil when the board is not built
+_READ_LUA = """
+if redis.call('EXISTS', KEYS[4]) == 0 then return false end
+local ids = redis.call('ZRANGE', KEYS[1], 0, -1)
+if #ids == 0 then return {} end
+return redis.call('HMGET', KEYS[2], unpack(ids))
+"""
+
+
+def _score(order_date: datetime) -> float:
+    return order_date.timestamp()
+
+
+async def _apply(restaurant_id: int, order_id: int, version: int, payload: str, score: float):
+    """Best effort: on any Redis error the board is dropped so the next read rebuilds it."""
+    redis_client = redis_cache.redis_client
+    if redis_client is None:
+        return
+    try:
+        await redis_client.eval(_APPLY_LUA, 5, *_board_keys(restaurant_id), order_id, version, payload, score,
+                                BOARD_TTL_SECONDS * 1000)
+    except Exception as e:
+        logger.warning("Could not update active-orders board for restaurant %s: %s", restaurant_id, e)
+        await invalidate_board(restaurant_id)
+
+
+async def board_add_order(restaurant_id: int, order: dict):
+    """`order` is an OrderForRestaurantResponse-shaped dict of a new order."""
+    response = OrderForRestaurantResponse.model_validate(order)
+    await _apply(restaurant_id, response.id, response.version,
+                 response.model_dump_json(), _score(response.order_date))
+
+
+async def board_apply_order(restaurant_id: int, response: OrderForRestaurantResponse):
+    """Mirrors an order after a status change: kept while active, removed otherwise."""
+    payload = response.model_dump_json() if response.status in ACTIVE_ORDER_STATUSES else ""
+    await _apply(restaurant_id, response.id, response.version, payload, _score(response.order_date))
+
+
+async def board_remove_order(restaurant_id: int, order_id: int, version: int):
+    await _apply(restaurant_id, order_id, version, "", 0)
+
+
+async def _reset_board(redis_client, restaurant_id: int) -> int:
+    return await redis_client.eval(_RESET_LUA, 5, *_board_keys(restaurant_id), BOARD_TTL_SECONDS)
+
+
+async def invalidate_board(restaurant_id: int):
+    """Drops the board, including any rebuild in flight that read Postgres before the caller's commit."""
+    redis_client = redis_cache.redis_client
+    if redis_client is None:
+        return
+    try:
+        await _reset_board(redis_client, restaurant_id)
+    except Exception as e:
+        logger.warning("Could not invalidate active-orders board for restaurant %s: %s", restaurant_id, e)
+
+
+def _load_active_orders(db: Session, restaurant_id: int) -> List[OrderForRestaurantResponse]:
+    orders = db.query(OrderModel).options(
+        joinedload(OrderModel.user),
+        joinedload(OrderModel.order_items).joinedload(OrderItemModel.cuisine)
+    ).filter(
+        OrderModel.restaurant_id == restaurant_id,
+        OrderModel.status.in_(ACTIVE_ORDER_STATUSES)
+    ).order_by(OrderModel.order_date.asc()).all() # Show oldest first to prioritize
+    return [OrderForRestaurantResponse.model_validate(order) for order in orders]
+
+
+async def read_active_orders_json(db: Session, restaurant_id: int) -> str:
+    """
+    The restaurant's active orders as a JSON array (oldest first). Served from the
+    Redis board in one round trip; rebuilt from Postgres when it is missing.
+    """
+    redis_client = redis_cache.redis_client
+    keys = _board_keys(restaurant_id)
+
+    # 1. Fast path: pre-serialized payloads straight from Redis
+    payloads: Optional[list] = None
+    if redis_client is not None:
+        try:
+            payloads = await redis_client.eval(_READ_LUA, 5, *keys)
+        except Exception as e:
+            logger.warning("Could not read active-orders board for restaurant %s: %s", restaurant_id, e)
+            redis_client = None # serve from Postgres, don't try to rebuild
+    if payloads is not None:
+        return "[" + ",".join(payload for payload in payloads if payload is not None) + "]"
+
+    # 2. Miss: start a new generation before reading Postgres, so every write
+    #    committed after the snapshot lands on the board we are about to merge into
+    generation = None
+    if redis_client is not None:
+        try:
+            generation = await _reset_board(redis_client, restaurant_id)
+        except Exception as e:
+            logger.warning("Could not rebuild active-orders board for restaurant %s: %s", restaurant_id, e)
+
+    # 3. Load from Postgres and merge the snapshot into the board
+    orders = await asyncio.to_thread(_load_active_orders, db, restaurant_id)
+    serialized = [(order, order.model_dump_json()) for order in orders]
+
+    if generation is not None:
+        args = [generation, BOARD_TTL_SECONDS]
+        for order, payload in serialized:
+            args += [order.id, order.version, payload, _score(order.order_date)]
+        try:
+            if not await redis_client.eval(_MERGE_LUA, 5, *keys, *args):
+                logger.debug("Active-orders board for restaurant %s was reset during rebuild", restaurant_id)
+        except Exception as e:
+            logger.warning("Could not rebuild active-orders board for restaurant %s: %s", restaurant_id, e)
+
+    return "[" + ",".join(payload for _, payload in serialized) + "]"
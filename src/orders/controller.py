@@ -1,22 +1,30 @@
 # src/orders/controller.py
 
-from fastapi import APIRouter, Depends, HTTPException, status, Request, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Query, Response, Header
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session, joinedload
 from typing import List, Union, Optional
-from datetime import datetime, timedelta, timezone
-import math, json, asyncio
+import asyncio, logging
 
 from database.core import get_db
-from services.authService import get_current_user_or_restaurant
-from models.r_schema import OrderCreate, Order, OrderResponse, OrderForRestaurantResponse, OrderStatusUpdate
-from models.r_model import (Order as OrderModel, User as UserModel, Restaurant as RestaurantModel, Cuisine as CuisineModel, OrderItem as OrderItemModel)
+from models.r_schema import (OrderCreate, Order, OrderResponse, OrderForRestaurantResponse, OrderStatusUpdate,
+                              OrderBulkStatusUpdate, OrderBulkStatusResult)
+from models.r_model import (Order as OrderModel, User as UserModel, Restaurant as RestaurantModel, OrderItem as OrderItemModel)
 from user.service import get_current_user
 from restaurant.service import get_current_restaurant
-from cache.redis_client import redis_client, get_redis_client
-from services.authService import get_password_hash, get_current_entity_for_stream
+from cache.redis_client import get_redis_client
+from services.authService import get_current_entity_for_stream
+from services.idempotencyService import IdempotentRequest, request_fingerprint
+from services.rateLimitService import rate_limit
+from notifications.service import enqueue_notification, wake_dispatcher
+from notifications.hub import notification_hub
+from notifications.sse import notification_event_stream, STREAM_ID_PATTERN
+from .board import board_apply_order, board_remove_order, invalidate_board, read_active_orders_json
+from .services import place_order, bulk_update_order_status, transition_order_status, USER_CANCELLABLE_STATUSES
 
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(
     prefix='/order',
     tags=['order']
@@ -26,17 +34,22 @@ router = APIRouter(
 # 🔹 ORDER APIs
 
 # order place by user:
-@router.post("/create/{restaurant_id}", response_model=Order)
+@router.post("/create/{restaurant_id}", response_model=Order, dependencies=[Depends(rate_limit("order_create"))])
 async def create_order(
     restaurant_id: int,
     order_data: OrderCreate, 
+    response: Response,
     db: Session = Depends(get_db),
     current_user: UserModel = Depends(get_current_user),
     redis_client = Depends(get_redis_client),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
 ):
     """
     Creates a new order. It VERIFIES the total price sent by the client
     against a secure, backend-calculated total.
+
+    Clients may send an `Idempotency-Key` header: retries with the same key
+    replay the first response instead of placing the order again.
     """
     if not isinstance(current_user, UserModel):
         raise HTTPException(
@@ -44,77 +57,30 @@ async def create_order(
             detail="Restaurant owners cannot place orders."
         )
 
-    # 1. Fetch all cuisine details from the DB to get the TRUE prices
-    cuisine_ids = [item.cuisine_id for item in order_data.items]
-    cuisines = db.query(CuisineModel).filter(CuisineModel.id.in_(cuisine_ids)).all()
-    cuisine_map = {c.id: c for c in cuisines}
-
-    # 2. Securely calculate the total price on the backend
-    backend_total_price = 0
-    order_items_to_create = []
-
-    for item_data in order_data.items:
-        cuisine = cuisine_map.get(item_data.cuisine_id)
-        
-        if not cuisine or cuisine.restaurant_id != restaurant_id:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Cuisine with id {item_data.cuisine_id} not found."
-            )
-
-        price_for_item = cuisine.price_full if item_data.size == "full" else cuisine.price_half
-        
-        if price_for_item is None:
-             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Cuisine '{cuisine.cuisine_name}' does not have a '{item_data.size}' price option."
-            )
-            
-        backend_total_price += price_for_item * item_data.quantity
-        
-        order_items_to_create.append(
-            OrderItemModel(
-                cuisine_id=item_data.cuisine_id,
-                quantity=item_data.quantity,
-                size=item_data.size,
-                price_at_purchase=price_for_item
-            )
-        )
-
-    # 3. VERIFY the frontend price against the secure backend price
-    # We use math.isclose() to handle potential floating-point inaccuracies
-    if not math.isclose(order_data.client_total_price, backend_total_price):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Price mismatch. Client price: {order_data.client_total_price}, Server price: {backend_total_price}. Please refresh."
-        )
+    if not idempotency_key:
+        return await place_order(db, redis_client, restaurant_id, order_data, current_user)
 
-    # 4. Create the order using the TRUSTED, backend-calculated price
-    db_order = OrderModel(
-        total_price=backend_total_price, # <-- Using the secure price
-        restaurant_id=restaurant_id,
-        user_id=current_user.id
+    idempotent = IdempotentRequest(
+        redis_client,
+        scope=f"order:create:user:{current_user.id}",
+        key=idempotency_key,
+        fingerprint=request_fingerprint({"restaurant_id": restaurant_id, **order_data.model_dump()}),
     )
+    replay = await idempotent.begin()
+    if replay is not None:
+        response.headers["Idempotent-Replayed"] = "true"
+        return replay
 
-    db_order.order_items.extend(order_items_to_create)
-    
-    db.add(db_order)
-    db.commit()
+    try:
+        placed_order = await place_order(db, redis_client, restaurant_id, order_data, current_user)
+    except BaseException:
+        # Cancelled requests too, or the key stays in progress until its lock expires
+        await asyncio.shield(idempotent.release())
+        raise
 
-    notification_payload = {
-        "status": "Pending",
-        "receiver": "restaurant",
-        "payload": {
-            "order_id": db_order.id,
-            "message": f"Order #{db_order.id} has been placed by a user."
-        }
-    }
-
-    channel = f"restaurant:{db_order.restaurant_id}:notifications"
-    await redis_client.publish(channel, json.dumps(notification_payload))
-
-    db.refresh(db_order)
-    return db_order
+    order_response = Order.model_validate(placed_order).model_dump(mode="json")
+    await idempotent.complete(order_response)
+    return order_response
 
 
 # Order's status progress from restro side 
@@ -124,51 +90,68 @@ async def update_order_status(
     status_update: OrderStatusUpdate,
     db: Session = Depends(get_db),
     current_restaurant: RestaurantModel = Depends(get_current_restaurant),
-    redis_client = Depends(get_redis_client)
 ):
     """
     Allows a restaurant owner to update the status of one of their orders.
+    Only transitions allowed by ORDER_TRANSITIONS succeed; a transition that lost
+    a race (or a stale `expected_version`) gets a 409.
     """
-    # Fetch the order with all its relationships for the response
-    db_order = db.query(OrderModel).options(
-        joinedload(OrderModel.user),
-        joinedload(OrderModel.order_items).joinedload(OrderItemModel.cuisine)
-    ).filter(OrderModel.id == order_id).first()
-
-    if not db_order:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
-
-    # Security check: Ensure the order belongs to the current restaurant
-    if db_order.restaurant_id != current_restaurant.id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to update this order")
-
-    # Update status and save
-    db_order.status = status_update.new_status
-
-    if status_update.new_status == "Cancelled":
-        db_order.cancelled_by = "restaurant"
-
-    db.commit()
+    # 1. Atomic conditional UPDATE (ownership + allowed current status + version)
+    transitioned = transition_order_status(
+        db, order_id, status_update.new_status,
+        restaurant_id=current_restaurant.id,
+        expected_version=status_update.expected_version,
+        cancelled_by="restaurant" if status_update.new_status == "Cancelled" else None,
+    )
 
     notification_payload = {
         "status": f"{status_update.new_status.capitalize()}",
         "receiver": "user",
         "payload": {
-            "order_id": db_order.id,
-            "message": f"Order #{db_order.id} has been {status_update.new_status.lower()}."
+            "order_id": transitioned.id,
+            "message": f"Order #{transitioned.id} has been {status_update.new_status.lower()}."
         }
     }
     
-   # Use 'await' for the async publish command
-    channel = f"user:{db_order.user_id}:notifications"
-    await redis_client.publish(channel, json.dumps(notification_payload))
+    # 2. Queued in the same transaction; the outbox dispatcher publishes it
+    channel = f"user:{transitioned.user_id}:notifications"
+    enqueue_notification(db, channel, notification_payload)
 
-    db.refresh(db_order)
+    # 3. Load the response (with relationships) before committing
+    db_order = db.query(OrderModel).options(
+        joinedload(OrderModel.user),
+        joinedload(OrderModel.order_items).joinedload(OrderItemModel.cuisine)
+    ).filter(OrderModel.id == order_id).first()
+    response_order = OrderForRestaurantResponse.model_validate(db_order)
+
+    db.commit()
+    wake_dispatcher()
 
-    # Note: In a future step, you could add an SSE notification here
-    # to inform the USER that their order status has changed.
+    # 4. Mirror the change on the kitchen's active-orders board
+    await board_apply_order(transitioned.restaurant_id, response_order)
+    return response_order
 
-    return db_order
+
+# Many orders at once from the kitchen dashboard
+@router.patch("/restaurant/orders/status", response_model=OrderBulkStatusResult)
+async def bulk_update_order_statuses(
+    status_update: OrderBulkStatusUpdate,
+    db: Session = Depends(get_db),
+    current_restaurant: RestaurantModel = Depends(get_current_restaurant),
+):
+    """
+    Moves a list of the restaurant's orders to the same status in one UPDATE.
+    Every affected user is notified, same as the single-order endpoint.
+    The whole request is rejected if any order is not the restaurant's.
+    """
+    # Read before the commit expires current_restaurant (which would cost a reload)
+    restaurant_id = current_restaurant.id
+    updated_ids = bulk_update_order_status(
+        db, restaurant_id, status_update.order_ids, status_update.new_status
+    )
+    # Rebuilt from Postgres on the next read rather than patched order by order
+    await invalidate_board(restaurant_id)
+    return {"new_status": status_update.new_status, "order_ids": updated_ids}
 
 
 #  order status cancel order by user:
@@ -177,52 +160,46 @@ async def cancel_user_order(
     order_id: int,
     db: Session = Depends(get_db),
     current_user: UserModel = Depends(get_current_user),
-    redis_client = Depends(get_redis_client)
 ):
     """
     Allows the authenticated user to cancel their own order,
-    but only if the status is still 'Pending'.
+    but only if the status is still 'Pending' or 'Preparing'.
+    The check and the write are one conditional UPDATE, so a cancel racing the
+    kitchen's next transition either wins or gets a 409.
     """
-    # 1. Fetch the order from the database
-    db_order = db.query(OrderModel).filter(OrderModel.id == order_id).first()
-
-    # 2. Check if the order exists
-    if not db_order:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
-
-    # 3. Security Check: Ensure the user owns this order
-    if db_order.user_id != current_user.id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to cancel this order")
-
-    # 4. Business Logic: Only allow cancellation if the order is still pending
-    if db_order.status != "Pending" and db_order.status != "Preparing":
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Cannot cancel order with status '{db_order.status}'"
-        )
-
-    # 5. Update the status
-    db_order.status = "Cancelled"
-    db_order.cancelled_by = "user"
-    db.commit()
+    # 1. Atomic conditional UPDATE (ownership + cancellable status)
+    transitioned = transition_order_status(
+        db, order_id, "Cancelled",
+        user_id=current_user.id,
+        allowed_from=USER_CANCELLABLE_STATUSES,
+        cancelled_by="user",
+    )
 
     notification_payload = {
         "status": "Cancelled",
         "receiver": "restaurant",
         "payload": {
-            "order_id": db_order.id,
-            "message": f"Order #{db_order.id} has been cancelled by the user."
+            "order_id": transitioned.id,
+            "message": f"Order #{transitioned.id} has been cancelled by the user."
         }
     }
     
-   # Use 'await' for the async publish command
-    channel = f"restaurant:{db_order.restaurant_id}:notifications"
-    await redis_client.publish(channel, json.dumps(notification_payload))
+    # 2. Queued in the same transaction; the outbox dispatcher publishes it
+    channel = f"restaurant:{transitioned.restaurant_id}:notifications"
+    enqueue_notification(db, channel, notification_payload)
 
+    # 3. Load the response before committing
+    db_order = db.query(OrderModel).options(
+        joinedload(OrderModel.order_items).joinedload(OrderItemModel.cuisine)
+    ).filter(OrderModel.id == order_id).first()
+    response_order = Order.model_validate(db_order)
 
+    db.commit()
+    wake_dispatcher()
 
-    db.refresh(db_order)
-    return db_order
+    # 4. Take it off the kitchen's active-orders board
+    await board_remove_order(transitioned.restaurant_id, transitioned.id, transitioned.version)
+    return response_order
 
 # ==============================================================
 
@@ -275,7 +252,7 @@ def get_restaurant_orders(
     eagerly loading all related data for high performance.
     Frontend will handle all date filtering.
     """
-    print(f"GET /restaurant/my-orders hit. Sending ALL orders for restaurant ID: {current_restaurant.id}")
+    logger.debug("Listing all orders for restaurant %s", current_restaurant.id)
     orders = db.query(OrderModel).options(
         joinedload(OrderModel.user),
         joinedload(OrderModel.order_items).joinedload(OrderItemModel.cuisine)
@@ -285,74 +262,65 @@ def get_restaurant_orders(
 
 
 @router.get("/restaurant/active-orders", response_model=List[OrderForRestaurantResponse])
-def get_restaurant_active_orders(
+async def get_restaurant_active_orders(
     db: Session = Depends(get_db),
     current_restaurant: RestaurantModel = Depends(get_current_restaurant)
 ):
     """
-    Retrieves all orders for a restaurant that are not yet delivered or cancelled.
+    Retrieves all orders for a restaurant that are not yet delivered or cancelled,
+    oldest first. Served pre-serialized from the Redis active-orders board
+    (rebuilt from Postgres when missing), so polling cost doesn't grow with items.
     """
-    active_statuses = ["Pending", "Preparing", "Ready"]
-    
-    orders = db.query(OrderModel).options(
-        joinedload(OrderModel.user),
-        joinedload(OrderModel.order_items).joinedload(OrderItemModel.cuisine)
-    ).filter(
-        OrderModel.restaurant_id == current_restaurant.id,
-        OrderModel.status.in_(active_statuses)
-    ).order_by(OrderModel.order_date.asc()).all() # Show oldest first to prioritize
-    
-    return orders
+    content = await read_active_orders_json(db, current_restaurant.id)
+    return Response(content=content, media_type="application/json")
 
 
 # ==========================================================
 
 
 # Real Time Notifications via Redis Pub/Sub
+# (shared hub subscription + resumable streams, see notifications/sse.py)
 @router.get("/notifications/stream")
 async def stream_notifications(
     request: Request,
-    redis_client = Depends(get_redis_client),
     # This dependency now returns either a User or a Restaurant object
-    current_entity: Union[UserModel, RestaurantModel] = Depends(get_current_entity_for_stream)
+    current_entity: Union[UserModel, RestaurantModel] = Depends(get_current_entity_for_stream),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID", pattern=STREAM_ID_PATTERN),
+    resume_from: Optional[str] = Query(None, pattern=STREAM_ID_PATTERN, description="Same as the Last-Event-ID header, for the first connection"),
+    coalesce_ms: Optional[int] = Query(None, ge=1, le=1000, description="Batch events arriving within this window into one frame with an array payload"),
 ):
     """
     A unified Server-Sent Events endpoint to stream real-time 
     notifications to either a logged-in user or a restaurant.
-    """
-    async def event_generator():
-        # Use isinstance() to check the type of the logged-in entity
-        if isinstance(current_entity, RestaurantModel):
-            # If it's a restaurant, subscribe to the restaurant's channel
-            channel = f"restaurant:{current_entity.id}:notifications"
-        elif isinstance(current_entity, UserModel):
-            # If it's a user, subscribe to the user's channel
-            channel = f"user:{current_entity.id}:notifications"
-        else:
-            # A fallback in case of an unexpected entity type
-            return
-
-        pubsub = redis_client.pubsub()
-        await pubsub.subscribe(channel)
-        
-        try:
-            async for message in pubsub.listen(): # should in 'for'
-                if await request.is_disconnected():
-                    break
-                
-                if message and message.get("type") == "message":
-                    data = message["data"]
-                    print(f"\n\n\tmessage is: {message}\n\n") # message is redis json obj
-                    yield f"data: {data}\n\n"
-                
-                # A small sleep to prevent a tight loop if no messages
-                await asyncio.sleep(0.1)
-        finally:
-            # Clean up the subscription when the client disconnects
-            await pubsub.unsubscribe(channel)
-
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
 
+    When resuming, missed events are replayed before live ones. If they can no
+    longer all be replayed, an `event: reset` tells the client to refetch its
+    orders instead.
 
+    With `coalesce_ms`, every frame's data is a JSON array: events arriving within
+    `coalesce_ms` of the first one (at most SSE_COALESCE_MAX_EVENTS) are sent
+    together, so no event waits longer than the window.
+    """
+    # Use isinstance() to check the type of the logged-in entity
+    if isinstance(current_entity, RestaurantModel):
+        # If it's a restaurant, listen on the restaurant's channel
+        channel = f"restaurant:{current_entity.id}:notifications"
+    elif isinstance(current_entity, UserModel):
+        # If it's a user, listen on the user's channel
+        channel = f"user:{current_entity.id}:notifications"
+    else:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Unknown account type.")
+
+    if not notification_hub.running:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Notifications are not available.")
+
+    return StreamingResponse(
+        notification_event_stream(request, [channel], last_event_id or resume_from, coalesce_ms),
+        media_type="text/event-stream",
+    )
 
 
+@router.get("/notifications/metrics")
+def notification_stream_metrics():
+    """Connection and queue counters of this worker's notification hub."""
+    return notification_hub.metrics()
@@ -0,0 +1,450 @@
+from fastapi import HTTPException, status
+from sqlalchemy import text, update, select
+from sqlalchemy.orm import Session
+from typing import Dict, FrozenSet, List, Optional
+import asyncio, math, os
+
+from database.core import SessionLocal
+from models.r_schema import OrderCreate
+from models.r_model import User as UserModel, Order as OrderModel
+from cuisines.service import get_price_book
+from notifications.service import enqueue_notifications, wake_dispatcher
+from .board import board_add_order
+
+
+# ==========================================================
+# 🔹 Order write path
+#
+# The order, all of its items and the restaurant's outbox notification are
+# written by ONE statement (data-modifying CTEs), and the response is built from
+# its RETURNING rows plus the price book, so placing an order costs a single
+# INSERT round trip and the COMMIT.
+
+_INSERT_ORDER_SQL = text("""
+WITH new_order AS (
+    INSERT INTO orders (total_price, user_id, restaurant_id, status, order_date)
+    VALUES (:total_price, :user_id, :restaurant_id, 'Pending', now())
+    RETURNING id, order_date
+), new_items AS (
+    INSERT INTO order_items (order_id, cuisine_id, quantity, size, price_at_purchase)
+    SELECT new_order.id, item.cuisine_id, item.quantity, item.size, item.price
+    FROM new_order, unnest(
+        CAST(:cuisine_ids AS bigint[]),
+        CAST(:quantities AS integer[]),
+        CAST(:sizes AS varchar[]),
+        CAST(:prices AS double precision[])
+    ) AS item(cuisine_id, quantity, size, price)
+    RETURNING id, cuisine_id, quantity, size, price_at_purchase
+), outbox AS (
+    -- same payload shape as the other order notifications (see orders/controller.py)
+    INSERT INTO notification_outbox (channel, payload, created_at, attempts)
+    SELECT :channel, json_build_object(
+        'status', 'Pending',
+        'receiver', 'restaurant',
+        'payload', json_build_object(
+            'order_id', new_order.id,
+            'message', 'Order #' || new_order.id || ' has been placed by a user.'
+        )
+    )::text, now(), 0
+    FROM new_order
+)
+SELECT new_order.id AS order_id, new_order.order_date,
+       new_items.id, new_items.cuisine_id, new_items.quantity, new_items.size, new_items.price_at_purchase
+FROM new_order, new_items
+""")
+
+
+def insert_order(db: Session, restaurant_id: int, user_id: int, total_price: float, items: List[dict]) -> dict:
+    """
+    Inserts an order with its items and notification in one round trip (no commit).
+    `items` are dicts with cuisine_id, quantity, size and price_at_purchase.
+    Returns the new order id, order_date and the inserted item rows.
+    """
+    rows = db.execute(_INSERT_ORDER_SQL, {
+        "total_price": total_price,
+        "user_id": user_id,
+        "restaurant_id": restaurant_id,
+        "cuisine_ids": [item["cuisine_id"] for item in items],
+        "quantities": [item["quantity"] for item in items],
+        "sizes": [item["size"] for item in items],
+        "prices": [item["price_at_purchase"] for item in items],
+        "channel": f"restaurant:{restaurant_id}:notifications",
+    }).mappings().all()
+
+    return {
+        "id": rows[0]["order_id"],
+        "order_date": rows[0]["order_date"],
+        "items": [dict(row) for row in rows],
+    }
+
+
+# ==========================================================
+# 🔹 Optional group commit for order bursts
+#
+# With ORDER_GROUP_COMMIT=true, concurrent order inserts are queued, collected for
+# up to ORDER_GROUP_COMMIT_WINDOW_MS and written by a background writer in ONE
+# transaction, so a burst pays one commit/fsync instead of one per order.
+# A larger window means bigger batches (throughput) but adds up to that much
+# latency to each order. Every caller still gets its own order id, and a failing
+# order only fails its own request.
+
+ORDER_GROUP_COMMIT = os.environ.get('ORDER_GROUP_COMMIT', 'false').lower() == 'true'
+ORDER_GROUP_COMMIT_WINDOW_MS = float(os.environ.get('ORDER_GROUP_COMMIT_WINDOW_MS', '5'))
+ORDER_GROUP_COMMIT_MAX_BATCH = int(os.environ.get('ORDER_GROUP_COMMIT_MAX_BATCH', '64'))
+ORDER_GROUP_COMMIT_WRITERS = int(os.environ.get('ORDER_GROUP_COMMIT_WRITERS', '1'))
+
+
+class OrderGroupCommitter:
+
+    def __init__(self, window_ms: float, max_batch: int, writers: int = 1):
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.writers = writers
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.writers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, restaurant_id: int, user_id: int, total_price: float, items: List[dict]) -> dict:
+        """Queues one order and waits until the batch containing it is committed."""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(((restaurant_id, user_id, total_price, items), future))
+        return await future
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            if self.window > 0:
+                await asyncio.sleep(self.window)
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            try:
+                results = await asyncio.to_thread(self._write_batch, [args for args, _ in batch])
+            except Exception as e:
+                results = [e] * len(batch)
+
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue # caller went away
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+            wake_dispatcher()
+
+    @staticmethod
+    def _write_batch(batch: List[tuple]) -> list:
+        with SessionLocal() as db:
+            # Fast path: every order in one transaction, one commit
+            try:
+                results = [insert_order(db, *args) for args in batch]
+                db.commit()
+                return results
+            except Exception:
+                db.rollback()
+                if len(batch) == 1:
+                    raise
+
+            # Something in the batch failed: redo it with a SAVEPOINT per order so
+            # only the bad orders fail
+            results = []
+            for args in batch:
+                try:
+                    with db.begin_nested():
+                        results.append(insert_order(db, *args))
+                except Exception as e:
+                    results.append(e)
+            db.commit()
+            return results
+
+
+order_group_committer: Optional[OrderGroupCommitter] = None
+
+
+def start_order_group_commit():
+    global order_group_committer
+    if ORDER_GROUP_COMMIT:
+        order_group_committer = OrderGroupCommitter(
+            ORDER_GROUP_COMMIT_WINDOW_MS, ORDER_GROUP_COMMIT_MAX_BATCH, ORDER_GROUP_COMMIT_WRITERS
+        )
+        order_group_committer.start()
+
+
+async def stop_order_group_commit():
+    global order_group_committer
+    if order_group_committer is not None:
+        await order_group_committer.stop()
+        order_group_committer = None
+
+
+async def place_order(db: Session, redis_client, restaurant_id: int, order_data: OrderCreate, current_user: UserModel) -> dict:
+    """
+    Prices the order from the restaurant's price book, rejects stale client totals,
+    and stores the order with its items and the restaurant's notification in one
+    transaction. Returns the `Order` response as a dict.
+    """
+    user_id, username = current_user.id, current_user.username # read before commit expires the instance
+
+    # 1. Get the TRUE prices (cached per restaurant, reloaded when the menu version changes)
+    price_book = await get_price_book(db, redis_client, restaurant_id)
+
+    # 2. Securely calculate the total price on the backend
+    backend_total_price = 0
+    order_items_to_create = []
+
+    for item_data in order_data.items:
+        cuisine = price_book.get(item_data.cuisine_id)
+
+        if not cuisine:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Cuisine with id {item_data.cuisine_id} not found."
+            )
+
+        if not cuisine.is_active:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Cuisine '{cuisine.cuisine_name}' is currently unavailable. Please refresh."
+            )
+
+        price_for_item = cuisine.price_full if item_data.size == "full" else cuisine.price_half
+
+        if price_for_item is None:
+             raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Cuisine '{cuisine.cuisine_name}' does not have a '{item_data.size}' price option."
+            )
+
+        backend_total_price += price_for_item * item_data.quantity
+
+        order_items_to_create.append({
+            "cuisine_id": item_data.cuisine_id,
+            "quantity": item_data.quantity,
+            "size": item_data.size,
+            "price_at_purchase": price_for_item,
+        })
+
+    # 3. VERIFY the frontend price against the secure backend price
+    # We use math.isclose() to handle potential floating-point inaccuracies
+    if not math.isclose(order_data.client_total_price, backend_total_price):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Price mismatch. Client price: {order_data.client_total_price}, Server price: {backend_total_price}. Please refresh."
+        )
+
+    # 4. Create the order using the TRUSTED, backend-calculated price
+    if order_group_committer is not None:
+        inserted = await order_group_committer.submit(restaurant_id, user_id, backend_total_price, order_items_to_create)
+    else:
+        def insert_and_commit():
+            inserted = insert_order(db, restaurant_id, user_id, backend_total_price, order_items_to_create)
+            db.commit()
+            return inserted
+
+        inserted = await asyncio.to_thread(insert_and_commit)
+        wake_dispatcher()
+
+    # 5. Build the response from data already in hand (no refresh / lazy loads)
+    order_items = [
+        {
+            "id": row["id"],
+            "quantity": row["quantity"],
+            "size": row["size"],
+            "price_at_purchase": row["price_at_purchase"],
+            "cuisine": {"cuisine_name": price_book[row["cuisine_id"]].cuisine_name},
+        }
+        for row in inserted["items"]
+    ]
+
+    # 6. Show it on the kitchen's active-orders board
+    await board_add_order(restaurant_id, {
+        "id": inserted["id"],
+        "order_date": inserted["order_date"],
+        "status": "Pending",
+        "total_price": backend_total_price,
+        "user": {"username": username},
+        "order_items": order_items,
+        "version": 1,
+    })
+
+    return {
+        "id": inserted["id"],
+        "user_id": user_id,
+        "restaurant_id": restaurant_id,
+        "status": "Pending",
+        "total_price": backend_total_price,
+        "version": 1,
+        "order_items": order_items,
+    }
+
+
+# ==========================================================
+# 🔹 Order state machine
+#
+# Every status change is ONE conditional UPDATE: it only matches while the order
+# is still in a status the transition is allowed from (and, if the client sent
+# one, still at the version it saw), and bumps `version`. Two racing transitions
+# (e.g. a user cancel and the kitchen starting to prepare) cannot both win: the
+# loser matches no row and gets a 409.
+
+ORDER_TRANSITIONS: Dict[str, FrozenSet[str]] = {
+    "Pending": frozenset({"Preparing", "Cancelled"}),
+    "Preparing": frozenset({"Ready", "Cancelled"}),
+    "Ready": frozenset({"Delivered", "Cancelled"}),
+    "Delivered": frozenset(),
+    "Cancelled": frozenset(),
+}
+
+# Users may only cancel before the food is ready
+USER_CANCELLABLE_STATUSES = frozenset({"Pending", "Preparing"})
+
+
+def statuses_allowing(new_status: str) -> FrozenSet[str]:
+    """The statuses an order may move to `new_status` from."""
+    return frozenset(current for current, targets in ORDER_TRANSITIONS.items() if new_status in targets)
+
+
+def transition_order_status(
+    db: Session,
+    order_id: int,
+    new_status: str,
+    *,
+    restaurant_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    allowed_from: Optional[FrozenSet[str]] = None,
+    expected_version: Optional[int] = None,
+    cancelled_by: Optional[str] = None,
+):
+    """
+    Atomically moves one order to `new_status` (no commit). The order must belong
+    to `restaurant_id` / `user_id` when given, be in one of `allowed_from`
+    (default: every status the state machine allows) and be at `expected_version`
+    when given. Returns the updated row (id, user_id, restaurant_id, status, version).
+    Raises 404 / 403 / 409; the extra SELECT to tell them apart only runs on failure.
+    """
+    if allowed_from is None:
+        allowed_from = statuses_allowing(new_status)
+
+    values = {"status": new_status, "version": OrderModel.version + 1}
+    if cancelled_by is not None:
+        values["cancelled_by"] = cancelled_by
+
+    conditions = [OrderModel.id == order_id, OrderModel.status.in_(allowed_from)]
+    if restaurant_id is not None:
+        conditions.append(OrderModel.restaurant_id == restaurant_id)
+    if user_id is not None:
+        conditions.append(OrderModel.user_id == user_id)
+    if expected_version is not None:
+        conditions.append(OrderModel.version == expected_version)
+
+    row = db.execute(
+        update(OrderModel)
+        .where(*conditions)
+        .values(**values)
+        .returning(OrderModel.id, OrderModel.user_id, OrderModel.restaurant_id, OrderModel.status, OrderModel.version)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if row is not None:
+        return row
+
+    # Lost: find out why
+    current = db.execute(
+        select(OrderModel.restaurant_id, OrderModel.user_id, OrderModel.status, OrderModel.version)
+        .where(OrderModel.id == order_id)
+    ).first()
+
+    if current is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
+    if (restaurant_id is not None and current.restaurant_id != restaurant_id) or \
+       (user_id is not None and current.user_id != user_id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to update this order")
+    if expected_version is not None and current.version != expected_version:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Order #{order_id} was changed by someone else (now '{current.status}', version {current.version}). Please refresh."
+        )
+    raise HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=f"Cannot change order #{order_id} from '{current.status}' to '{new_status}'."
+    )
+
+
+# ==========================================================
+# 🔹 Bulk status changes (kitchen dashboards)
+
+def bulk_update_order_status(db: Session, restaurant_id: int, order_ids: List[int], new_status: str) -> List[int]:
+    """
+    Moves many of a restaurant's orders to `new_status` with one UPDATE ... RETURNING
+    and queues every user's notification with one multi-row outbox INSERT, then
+    commits. Ownership and the state machine are part of the UPDATE's WHERE
+    clause: if any id is unknown or belongs to another restaurant (404), or cannot
+    make the transition (409), nothing is changed. Returns the updated order ids.
+    """
+    requested_ids = set(order_ids)
+
+    values = {"status": new_status, "version": OrderModel.version + 1}
+    if new_status == "Cancelled":
+        values["cancelled_by"] = "restaurant"
+
+    # 1. One set-based conditional UPDATE, scoped to this restaurant
+    rows = db.execute(
+        update(OrderModel)
+        .where(
+            OrderModel.id.in_(requested_ids),
+            OrderModel.restaurant_id == restaurant_id,
+            OrderModel.status.in_(statuses_allowing(new_status)),
+        )
+        .values(**values)
+        .returning(OrderModel.id, OrderModel.user_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    # 2. All or nothing: report which ids failed and why
+    missing_ids = requested_ids - {order_id for order_id, _ in rows}
+    if missing_ids:
+        db.rollback()
+        current = dict(db.execute(
+            select(OrderModel.id, OrderModel.status)
+            .where(OrderModel.id.in_(missing_ids), OrderModel.restaurant_id == restaurant_id)
+        ).all())
+        not_found = sorted(missing_ids - current.keys())
+        if not_found:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Orders not found or do not belong to this restaurant: {not_found}"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Cannot change these orders to '{new_status}': " +
+                   ", ".join(f"#{order_id} is '{current[order_id]}'" for order_id in sorted(current))
+        )
+
+    # 3. Same notification as the single-order endpoint, one per order, one INSERT
+    enqueue_notifications(db, [
+        (
+            f"user:{user_id}:notifications",
+            {
+                "status": f"{new_status.capitalize()}",
+                "receiver": "user",
+                "payload": {
+                    "order_id": order_id,
+                    "message": f"Order #{order_id} has been {new_status.lower()}."
+                }
+            },
+        )
+        for order_id, user_id in sorted(rows)
+    ])
+
+    db.commit()
+    # The dispatcher publishes the whole batch through one Redis pipeline
+    wake_dispatcher()
+    return sorted(order_id for order_id, _ in rows)
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Form, File, Query
+from fastapi import APIRouter, Depends, HTTPException, Form, File, Query, Header
 from fastapi import UploadFile, status, Request
 from fastapi.responses import StreamingResponse
 
@@ -9,28 +9,28 @@ from typing import List
 from datetime import datetime, timedelta
 import math, json
 from typing import Optional, Union, List
-import os, uuid
+import logging
 
 from database.core import get_db
 from services.authService import get_password_hash, get_current_entity_for_stream
 from models.r_schema import (RestaurantCreate, Restaurant, RestaurantStatusUpdate, RestaurantAnalytics)
 from models.r_model import (Restaurant as RestaurantModel, OrderItem as OrderItemModel, Cuisine as CuisineModel, Order as OrderModel, User as UserModel)
-from .service import get_current_restaurant, get_restaurant_status_by_id
+from .service import get_current_restaurant, get_restaurant_statuses, enqueue_location_event, location_feed_channel
 from services.authService import get_current_user_or_restaurant
 from dotenv import load_dotenv
 import json, asyncio
 
-
-# For Google Cloud Storage
-from google.oauth2 import service_account
-from google.cloud import storage
-from google.api_core import exceptions
+from services.storageService import store_upload
+from services.imageService import schedule_image_variants
 from cache.redis_client import get_redis_client
+from cuisines.service import refresh_restaurant_categories
+from notifications.service import wake_dispatcher
+from notifications.hub import notification_hub
+from notifications.sse import notification_event_stream, STREAM_ID_PATTERN
 
 load_dotenv()
-GCP_PROJECT_ID = os.getenv("GCP_PROJECT_ID")
-GCP_BUCKET_NAME = os.getenv("GCP_BUCKET_NAME")
-GCP_APPLICATION_CREDENTIALS = os.getenv("GCP_APPLICATION_CREDENTIALS")
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix='/restaurant',
@@ -38,17 +38,6 @@ router = APIRouter(
 )
 
 
-# --- Google Cloud Storage Setup ---
-try:
-    # Authenticate with Google Cloud using service account credentials
-    credentials = service_account.Credentials.from_service_account_file(GCP_APPLICATION_CREDENTIALS)
-    storage_client = storage.Client(project=GCP_PROJECT_ID, credentials=credentials)
-    bucket = storage_client.bucket(GCP_BUCKET_NAME)
-except Exception as e:
-    print(f"Error initializing Google Cloud Storage client: {e}")
-    storage_client = None
-    bucket = None
-
 # ==========================================================
 # 🔹 RESTAURANT Auth APIs (Now Protected)
 
@@ -97,11 +86,11 @@ async def get_all_restaurants(
 
     final_restaurants = []
 
+    statuses = await get_restaurant_statuses(redis_client, db_restaurants)
     for rest in db_restaurants:
-        status_data = await get_restaurant_status_by_id(db, redis_client, rest.id)
+        status_data = statuses.get(rest.id)
         rest_pydantic = Restaurant.model_validate(rest)
         rest_dict = rest_pydantic.model_dump()
-        print(f"\n\n\tStatus Data fetched: {status_data}\n\n")
         
         if status_data:
             rest_dict.update(status_data)
@@ -116,7 +105,7 @@ def get_restaurants_by_category(
     location: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    print(f"Fetching restaurants for category: {category_name}, location: {location}")
+    logger.debug("Listing restaurants for category %r, location %r", category_name, location)
     
     query = db.query(RestaurantModel).join(CuisineModel).filter(
         CuisineModel.cuisine_type == category_name,
@@ -129,7 +118,6 @@ def get_restaurants_by_category(
         locations_list = [loc.strip() for loc in location.split(',') if loc.strip()]
         location_conditions = [RestaurantModel.location.ilike(f"%{loc}%") for loc in locations_list]
         if location_conditions:
-            print(f"\tApplying robust location filter for: {locations_list}")
             query = query.filter(or_(*location_conditions))
 
     # --------------------------------
@@ -175,8 +163,9 @@ async def search_restaurants_by_cuisine(
 
     # --- Add Status Info (same logic as your /get_all endpoint) ---
     final_restaurants = []
+    statuses = await get_restaurant_statuses(redis_client, db_restaurants)
     for rest in db_restaurants:
-        status_data = await get_restaurant_status_by_id(db, redis_client, rest.id)
+        status_data = statuses.get(rest.id)
         rest_pydantic = Restaurant.model_validate(rest)
         rest_dict = rest_pydantic.model_dump()
         if status_data:
@@ -189,6 +178,7 @@ async def search_restaurants_by_cuisine(
 @router.patch("/update_details", response_model=Restaurant)
 async def update_restaurant_details(
     db: Session = Depends(get_db),
+    redis_client = Depends(get_redis_client),
     current_restaurant: RestaurantModel = Depends(get_current_restaurant),
     name: str | None = Form(None),
     location: str | None = Form(None),
@@ -196,9 +186,7 @@ async def update_restaurant_details(
     contact_email: str | None = Form(None),
     image: UploadFile | None = File(None),
 ):
-    print("▶️ In restro update details")
-    print(f"Type of 'image' is: {type(image)}")
-
+    previous_location = current_restaurant.location
     if name:
         current_restaurant.name = name
     if location:
@@ -210,34 +198,34 @@ async def update_restaurant_details(
 
      # Handle image upload if a file is provided
      # Note: `image` can be None, so we check its type first
+    variant_source = None
     if image is not None:
-        print("✅ SUCCESS: The isinstance check passed!")
-        print(f"Image filename is: {image.filename}")
-
         if not image.filename:
             raise HTTPException(status_code=400, detail="Please select a valid image.")
 
-        if not storage_client or not bucket:
-            raise HTTPException(status_code=500, detail="GCS not configured properly.")
-        
         try:
-
-            file_ext = os.path.splitext(image.filename)[1]
-            unique_name = f"{uuid.uuid4()}{file_ext}"
-
-            blob = bucket.blob(unique_name)
-
-            # `image.file` is a SpooledTemporaryFile – reset pointer
-            image.file.seek(0)
-            blob.upload_from_file(image.file, content_type=image.content_type)
-
-            current_restaurant.image_url = blob.public_url
-        except Exception as e:
-            print(f"Image is not Uploaded,due to this: 👇 👇 👇\n\t{e}")
+            # Hashed and uploaded in a worker thread; an identical image is not sent again
+            image_url = await store_upload(image, "restaurant_images")
+            if image_url != current_restaurant.image_url or not current_restaurant.image_variants:
+                current_restaurant.image_url = image_url
+                current_restaurant.image_variants = None
+                await image.seek(0)
+                variant_source = await image.read()
+        except HTTPException:
+            raise
+        except Exception:
+            logger.exception("Could not upload image for restaurant %s", current_restaurant.id)
 
 
     db.commit()
     db.refresh(current_restaurant)
+
+    if variant_source is not None:
+        # Thumbnails are rendered after the response; listings show them once stored
+        schedule_image_variants(RestaurantModel, current_restaurant.id, current_restaurant.image_url, variant_source, "restaurant_images")
+
+    if current_restaurant.location != previous_location:
+        await refresh_restaurant_categories(db, redis_client, current_restaurant, previous_location=previous_location)
     return current_restaurant
 
 
@@ -262,13 +250,18 @@ async def update_restaurant_status(
     # Use model_dump(exclude_none=True) to get only the fields provided in the request body
     # This prevents updating fields that the owner didn't send.
     update_data = status_update.model_dump(exclude_none=True)
+    changed = {key: value for key, value in update_data.items() if getattr(current_restaurant, key) != value}
     
     # Apply updates to the database model instance
     for key, value in update_data.items():
         # This dynamically updates operating_status, kitchen_status, or delivery_status
         setattr(current_restaurant, key, value)
+
+    # Delta event for browsing clients of this location, committed with the change
+    enqueue_location_event(db, current_restaurant, "status", changed)
         
     db.commit()
+    wake_dispatcher()
     db.refresh(current_restaurant)
 
     cache_key = f"status:restaurant:{current_restaurant.id}"
@@ -280,9 +273,11 @@ async def update_restaurant_status(
         "delivery_status": current_restaurant.delivery_status,
     }
 
-    print(f"\n\n\tStatus Data to cache: {status_data}\n\n")
     # Store the JSON string in Redis (Set a 1 hour TTL - Time To Live)
     await redis_client.set(cache_key, json.dumps(status_data), ex=3600) 
+
+    if "operating_status" in update_data:
+        await refresh_restaurant_categories(db, redis_client, current_restaurant)
     return current_restaurant
 
 
@@ -312,13 +307,48 @@ def update_announcement(
         raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="Announcement exceeds 500 characters.")
     
     # Update the field
-    current_restaurant.announcement_text = announcement if announcement else None
+    new_text = announcement if announcement else None
+    if current_restaurant.announcement_text != new_text:
+        enqueue_location_event(db, current_restaurant, "announcement", {"announcement_text": new_text})
+    current_restaurant.announcement_text = new_text
     
     db.commit()
+    wake_dispatcher()
     db.refresh(current_restaurant)
     return current_restaurant
 
 
+# Public live feed for browsing clients
+@router.get("/live")
+async def stream_location_feed(
+    request: Request,
+    location: str = Query(..., description="City/location, or several separated by commas (max 5)"),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID", pattern=STREAM_ID_PATTERN),
+    resume_from: Optional[str] = Query(None, pattern=STREAM_ID_PATTERN),
+    coalesce_ms: Optional[int] = Query(None, ge=1, le=1000),
+):
+    """
+    Server-Sent Events with restaurant changes in the given location(s), so a
+    client can patch the list it got from /restaurant/get_all instead of polling.
+    Each event is a small delta:
+        {"type": "status", "restaurant_id": 1, "kitchen_status": "Busy"}
+        {"type": "announcement", "restaurant_id": 1, "announcement_text": "..."}
+    Locations match exactly (case and surrounding spaces ignored). Resuming and
+    `coalesce_ms` work as on /order/notifications/stream.
+    """
+    channels = sorted({location_feed_channel(loc) for loc in location.split(',') if loc.strip()})
+    if not channels or len(channels) > 5:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Give between 1 and 5 locations.")
+
+    if not notification_hub.running:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Live updates are not available.")
+
+    return StreamingResponse(
+        notification_event_stream(request, channels, last_event_id or resume_from, coalesce_ms),
+        media_type="text/event-stream",
+    )
+
+
 @router.get("/analytics", response_model=RestaurantAnalytics)
 def get_restaurant_analytics(
     db: Session = Depends(get_db),
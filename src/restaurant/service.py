@@ -1,5 +1,5 @@
 from fastapi import Depends, HTTPException, status
-from typing import Annotated
+from typing import Annotated, Dict, List
 from sqlalchemy.orm import Session
 import json
 from cache.redis_client import get_redis_client
@@ -7,10 +7,11 @@ from redis.asyncio import Redis
 
 from services.authService import get_current_user_or_restaurant 
 from models.r_model import (Restaurant as RestaurantModel)
+from cuisines.service import normalize_location
+from notifications.service import enqueue_notification
 
 
 def get_current_restaurant(entity: Annotated[RestaurantModel, Depends(get_current_user_or_restaurant)]):
-    print(f"\n\n\tIn GCR...")
     """Dependency to get a restaurant owner."""
     if not isinstance(entity, RestaurantModel):
         raise HTTPException(
@@ -52,7 +53,6 @@ async def get_restaurant_status_by_id(db: Session, redis_client: Redis, restaura
         "delivery_status": db_restaurant.delivery_status,
     }
 
-    print(f"\n\n\tStatus Data to cache: {status_data}\n\n")
     
     status_json = json.dumps(status_data)
     await redis_client.set(cache_key, status_json, ex=3600) # 1 hour TTL
@@ -60,4 +60,62 @@ async def get_restaurant_status_by_id(db: Session, redis_client: Redis, restaura
     return status_data
 
 
+async def get_restaurant_statuses(redis_client: Redis, restaurants: List[RestaurantModel]) -> Dict[int, dict]:
+    """
+    Cache-aside read of many restaurants' statuses at once: one MGET, and misses
+    are filled from the already loaded rows with one pipelined write (no query per row).
+    """
+    if not restaurants:
+        return {}
+
+    # 1. Check Cache for all of them in one round trip
+    cache_keys = [f"status:restaurant:{rest.id}" for rest in restaurants]
+    cached_statuses = await redis_client.mget(cache_keys)
+
+    statuses = {}
+    pipe = None
+    for rest, cache_key, cached_status in zip(restaurants, cache_keys, cached_statuses):
+        if cached_status is not None:
+            statuses[rest.id] = json.loads(cached_status)
+            continue
+
+        # 2. Cache Miss: the row is already here, no need to read PostgreSQL again
+        status_data = {
+            "operating_status": rest.operating_status,
+            "kitchen_status": rest.kitchen_status,
+            "delivery_status": rest.delivery_status,
+        }
+        statuses[rest.id] = status_data
+        if pipe is None:
+            pipe = redis_client.pipeline(transaction=False)
+        pipe.set(cache_key, json.dumps(status_data), ex=3600) # 1 hour TTL
+
+    # 3. Write back every miss (Refill Cache)
+    if pipe is not None:
+        await pipe.execute()
+    return statuses
+
+
+
+
+
+# ==========================================================
+# 🔹 Location live feed
+#
+# Status / announcement changes are published as small delta events on the
+# restaurant's location channel, so browsing clients (GET /restaurant/live) can
+# patch their lists instead of re-polling /restaurant/get_all.
+
+def location_feed_channel(location: str) -> str:
+    return f"location:{normalize_location(location)}:feed"
+
 
+def enqueue_location_event(db: Session, restaurant: RestaurantModel, event_type: str, changes: dict):
+    """Queues a delta event in the caller's transaction (published after commit by the outbox)."""
+    if not restaurant.location or not changes:
+        return
+    enqueue_notification(db, location_feed_channel(restaurant.location), {
+        "type": event_type,
+        "restaurant_id": restaurant.id,
+        **changes,
+    })
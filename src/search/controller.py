@@ -3,12 +3,16 @@ from fastapi import APIRouter, Depends, Query, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import func, or_
 from typing import List, Optional
+import logging
 
 from database.core import get_db
 from models.r_model import Restaurant as RestaurantModel, Cuisine as CuisineModel
 from models.r_schema import SearchResponse, SearchSuggestion, Restaurant
 from cache.redis_client import get_redis_client
-from restaurant.service import get_restaurant_status_by_id
+from restaurant.service import get_restaurant_statuses
+from services.rateLimitService import rate_limit
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix='/search',
@@ -17,7 +21,7 @@ router = APIRouter(
 
 # ... other imports ...
 
-@router.get("/suggestions", response_model=SearchResponse)
+@router.get("/suggestions", response_model=SearchResponse, dependencies=[Depends(rate_limit("search"))])
 def get_search_suggestions(
     query: str = Query(..., min_length=2),
     location: Optional[str] = Query(None, description="Optional: Filter by user's location"), # +++ ADD LOCATION
@@ -49,12 +53,12 @@ def get_search_suggestions(
             dish_query = dish_query.join(RestaurantModel).filter(or_(*location_conditions))
     db_dishes = dish_query.with_entities(CuisineModel.cuisine_name).distinct().limit(10).all()
 
-    restaurant_suggestions = [ SearchSuggestion( type="restaurant", id=rest.id, name=rest.name, image_url=rest.image_url ) for rest in db_restaurants ]
+    restaurant_suggestions = [ SearchSuggestion( type="restaurant", id=rest.id, name=rest.name, image_url=rest.image_url, image_variants=rest.image_variants ) for rest in db_restaurants ]
     dish_suggestions = [ SearchSuggestion( type="dish", name=dish_name[0] ) for dish_name in db_dishes ]
     return SearchResponse(restaurants=restaurant_suggestions, dishes=dish_suggestions)
 
 
-@router.get("/results", response_model=List[Restaurant])
+@router.get("/results", response_model=List[Restaurant], dependencies=[Depends(rate_limit("search"))])
 async def get_search_results(
     query: str = Query(..., description="The exact dish or category name"),
     location: Optional[str] = Query(None, description="Optional: Filter by user's location"),
@@ -70,7 +74,7 @@ async def get_search_results(
     )
 
     if location:
-        print(f"\n\tFiltering cuisines by location: {location}")
+        logger.debug("Filtering cuisines by location %r", location)
         # --- START FIX ---
         # Split the location string by comma
         locations_list = [loc.strip() for loc in location.split(',') if loc.strip()]
@@ -85,7 +89,7 @@ async def get_search_results(
 
     restaurant_ids = cuisine_query.distinct().all()
     restaurant_ids_list = [id[0] for id in restaurant_ids]
-    print(f"\n\tFound restaurant IDs matching cuisine '{query}': {restaurant_ids_list}")
+    logger.debug("%d restaurants match cuisine %r", len(restaurant_ids_list), query)
 
     if not restaurant_ids_list:
         return []
@@ -97,8 +101,9 @@ async def get_search_results(
 
     # ... (Rest of your code to add Redis status is correct)
     final_restaurants = []
+    statuses = await get_restaurant_statuses(redis_client, db_restaurants)
     for rest in db_restaurants:
-        status_data = await get_restaurant_status_by_id(db, redis_client, rest.id)
+        status_data = statuses.get(rest.id)
         rest_pydantic = Restaurant.model_validate(rest)
         rest_dict = rest_pydantic.model_dump()
         if status_data:
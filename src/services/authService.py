@@ -78,7 +78,6 @@ def get_current_user_or_restaurant(
     token: Annotated[str, Depends(oauth2_scheme)], 
     db: Session = Depends(get_db)):
 
-    print(f"\n\n\tIn GCUOR...")
     """
     Decodes the JWT token and returns the authenticated user or restaurant object.
     """
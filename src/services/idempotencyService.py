@@ -0,0 +1,207 @@
+from fastapi import HTTPException, status
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from redis.exceptions import RedisError
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+import asyncio, hashlib, json, logging, os
+
+from database.core import SessionLocal
+from models.r_model import IdempotencyKey as IdempotencyKeyModel
+
+logger = logging.getLogger(__name__)
+
+
+# How long a completed response is replayed, and how long an in-flight claim
+# survives a crashed worker before the key can be retried.
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', '86400'))
+IDEMPOTENCY_LOCK_SECONDS = int(os.environ.get('IDEMPOTENCY_LOCK_SECONDS', '60'))
+# How long a concurrent duplicate waits for the first request to finish
+IDEMPOTENCY_WAIT_SECONDS = float(os.environ.get('IDEMPOTENCY_WAIT_SECONDS', '10'))
+_POLL_INTERVAL = 0.05
+
+IN_PROGRESS = "in_progress"
+COMPLETED = "completed"
+
+
+def request_fingerprint(payload: dict) -> str:
+    """Stable hash of a request body, used to reject key reuse with a different body."""
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class IdempotentRequest:
+    """
+    Records the first response for (scope, key) so retries can be replayed.
+
+    Usage:
+        replay = await idem.begin()      # stored response, or None if we own the key
+        ... do the work ...
+        await idem.complete(response)    # or idem.release() if the work failed
+
+    Redis is the primary store (SET NX + TTL). If Redis errors, the same protocol
+    runs against the idempotency_keys table using INSERT ... ON CONFLICT DO NOTHING.
+    Records written there during an outage (or by complete() when Redis failed) are
+    still found afterwards: a claim that Redis grants is checked against the table.
+    """
+
+    def __init__(self, redis_client, scope: str, key: str, fingerprint: str):
+        self.redis_client = redis_client
+        self.scope = scope
+        self.key = key
+        self.fingerprint = fingerprint
+        self.redis_key = f"idempotency:{scope}:{key}"
+        self.backend = None # "redis" or "db", whichever accepted the claim
+
+    async def begin(self) -> Optional[dict]:
+        deadline = asyncio.get_running_loop().time() + IDEMPOTENCY_WAIT_SECONDS
+
+        while True:
+            record = await self._claim()
+            if record is None:
+                return None # we own the key, go ahead
+
+            if record["fingerprint"] != self.fingerprint:
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail="Idempotency-Key was already used with a different request body."
+                )
+            if record["status"] == COMPLETED:
+                return record["response"]
+
+            # Another request with this key is in flight: wait for its result
+            if asyncio.get_running_loop().time() >= deadline:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="A request with this Idempotency-Key is still being processed. Retry shortly."
+                )
+            await asyncio.sleep(_POLL_INTERVAL)
+
+    async def complete(self, response: dict):
+        record = {"status": COMPLETED, "fingerprint": self.fingerprint, "response": response}
+        if self.backend == "redis":
+            try:
+                await self.redis_client.set(self.redis_key, json.dumps(record), ex=IDEMPOTENCY_TTL_SECONDS)
+                return
+            except RedisError as e:
+                logger.warning("Could not store idempotent response in Redis, using Postgres: %s", e)
+        await asyncio.to_thread(self._db_complete, json.dumps(response))
+
+    async def release(self):
+        """Drops our claim so the client can retry after a failed attempt."""
+        if self.backend == "redis":
+            try:
+                await self.redis_client.delete(self.redis_key)
+                return
+            except RedisError as e:
+                logger.warning("Could not release idempotency key in Redis: %s", e)
+                return
+        if self.backend == "db":
+            await asyncio.to_thread(self._db_release)
+
+    # ---------- internals ----------
+
+    async def _claim(self) -> Optional[dict]:
+        """Returns None when the claim succeeded, otherwise the existing record."""
+        try:
+            claim = json.dumps({"status": IN_PROGRESS, "fingerprint": self.fingerprint})
+            if await self.redis_client.set(self.redis_key, claim, nx=True, ex=IDEMPOTENCY_LOCK_SECONDS):
+                # Redis had nothing, but the key may have been used while it was down
+                stored = await asyncio.to_thread(self._db_lookup)
+                if stored is None:
+                    self.backend = "redis"
+                    return None
+                record, ttl = stored
+                if record["status"] == COMPLETED:
+                    # Later retries replay straight from Redis
+                    await self.redis_client.set(self.redis_key, json.dumps(record), ex=ttl)
+                else:
+                    # Its owner finishes in Postgres; keep polling there
+                    await self.redis_client.delete(self.redis_key)
+                return record
+            existing = await self.redis_client.get(self.redis_key)
+            if existing is None:
+                return await self._claim() # expired between SET and GET
+            return json.loads(existing)
+        except RedisError as e:
+            logger.warning("Redis unavailable for idempotency, using Postgres: %s", e)
+            return await asyncio.to_thread(self._db_claim)
+
+    @staticmethod
+    def _record(row: IdempotencyKeyModel) -> dict:
+        return {
+            "status": row.status,
+            "fingerprint": row.fingerprint,
+            "response": json.loads(row.response) if row.response else None,
+        }
+
+    def _db_lookup(self) -> Optional[Tuple[dict, int]]:
+        """The unexpired record in Postgres and its seconds to live, if any."""
+        now = datetime.now(timezone.utc)
+        with SessionLocal() as db:
+            existing = db.execute(select(IdempotencyKeyModel).where(
+                IdempotencyKeyModel.scope == self.scope,
+                IdempotencyKeyModel.key == self.key,
+                IdempotencyKeyModel.expires_at > now,
+            )).scalar_one_or_none()
+            if existing is None:
+                return None
+            return self._record(existing), max(1, int((existing.expires_at - now).total_seconds()))
+
+    def _db_claim(self) -> Optional[dict]:
+        now = datetime.now(timezone.utc)
+        with SessionLocal() as db:
+            # Expired records behave as if they never existed
+            db.execute(delete(IdempotencyKeyModel).where(
+                IdempotencyKeyModel.scope == self.scope,
+                IdempotencyKeyModel.key == self.key,
+                IdempotencyKeyModel.expires_at < now,
+            ))
+            inserted = db.execute(
+                pg_insert(IdempotencyKeyModel).values(
+                    scope=self.scope,
+                    key=self.key,
+                    fingerprint=self.fingerprint,
+                    status=IN_PROGRESS,
+                    expires_at=now + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS),
+                ).on_conflict_do_nothing(index_elements=["scope", "key"]).returning(IdempotencyKeyModel.id)
+            ).first()
+            db.commit()
+
+            if inserted is not None:
+                self.backend = "db"
+                return None
+
+            existing = db.execute(select(IdempotencyKeyModel).where(
+                IdempotencyKeyModel.scope == self.scope,
+                IdempotencyKeyModel.key == self.key,
+            )).scalar_one_or_none()
+            if existing is None:
+                return self._db_claim()
+            return self._record(existing)
+
+    def _db_complete(self, response_json: str):
+        with SessionLocal() as db:
+            db.execute(
+                pg_insert(IdempotencyKeyModel).values(
+                    scope=self.scope,
+                    key=self.key,
+                    fingerprint=self.fingerprint,
+                    status=COMPLETED,
+                    response=response_json,
+                    expires_at=datetime.now(timezone.utc) + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS),
+                ).on_conflict_do_update(
+                    index_elements=["scope", "key"],
+                    set_={"status": COMPLETED, "response": response_json,
+                          "expires_at": datetime.now(timezone.utc) + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS)},
+                )
+            )
+            db.commit()
+
+    def _db_release(self):
+        with SessionLocal() as db:
+            db.execute(delete(IdempotencyKeyModel).where(
+                IdempotencyKeyModel.scope == self.scope,
+                IdempotencyKeyModel.key == self.key,
+                IdempotencyKeyModel.status == IN_PROGRESS,
+            ))
+            db.commit()
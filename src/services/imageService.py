@@ -0,0 +1,151 @@
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Dict, List, Tuple
+import hashlib, logging, os, threading
+
+from PIL import Image, ImageOps
+from prometheus_client import Counter
+
+from database.core import SessionLocal
+from .storageService import get_storage, StorageBackend
+
+logger = logging.getLogger(__name__)
+
+
+# ==========================================================
+# 🔹 Responsive image variants
+#
+# Listings used to send the full upload (often several MB) to every 100px card.
+# After an upload, a background worker renders each IMAGE_VARIANTS size in each
+# IMAGE_VARIANT_FORMATS format. It stores them next to the original as
+# <prefix>/variants/<sha256 of original>/<name>.<ext> and writes the URLs to the
+# row's image_variants, e.g. {"thumb": {"webp": ..., "jpeg": ...}, "card": {...}}.
+# Rendering is CPU-bound, so only IMAGE_VARIANT_WORKERS images are processed at a
+# time. Each queued job holds its original (up to STORAGE_MAX_UPLOAD_BYTES) in
+# memory, so at most IMAGE_VARIANT_BACKLOG jobs may be queued or running. Uploads
+# beyond that get no variants (clients fall back to image_url) and are counted in
+# image_variants_skipped_total. A re-uploaded original finds its variants already
+# stored and is not rendered again.
+
+# name=longest edge in px; images are only ever scaled down
+IMAGE_VARIANTS = os.environ.get('IMAGE_VARIANTS', 'thumb=160,card=480,hero=1280')
+IMAGE_VARIANT_FORMATS = os.environ.get('IMAGE_VARIANT_FORMATS', 'webp,jpeg')
+IMAGE_VARIANT_QUALITY = int(os.environ.get('IMAGE_VARIANT_QUALITY', '80'))
+IMAGE_VARIANT_WORKERS = int(os.environ.get('IMAGE_VARIANT_WORKERS', '2'))
+IMAGE_VARIANT_BACKLOG = int(os.environ.get('IMAGE_VARIANT_BACKLOG', '16'))
+
+IMAGE_VARIANTS_SKIPPED = Counter("image_variants_skipped_total", "Uploads left without variants because the backlog was full")
+
+_FORMATS = {
+    "webp": ("WEBP", "image/webp"),
+    "jpeg": ("JPEG", "image/jpeg"),
+}
+
+
+def _parse_variants(value: str) -> List[Tuple[str, int]]:
+    variants = []
+    for part in value.split(","):
+        name, _, size = part.partition("=")
+        if name.strip() and size.strip():
+            variants.append((name.strip(), int(size)))
+    return variants
+
+
+VARIANT_SIZES = _parse_variants(IMAGE_VARIANTS)
+VARIANT_FORMATS = [fmt.strip() for fmt in IMAGE_VARIANT_FORMATS.split(",") if fmt.strip() in _FORMATS]
+
+_executor = ThreadPoolExecutor(max_workers=IMAGE_VARIANT_WORKERS, thread_name_prefix="image-variants")
+# The executor's own queue is unbounded; this caps queued + running jobs
+_backlog = threading.BoundedSemaphore(IMAGE_VARIANT_BACKLOG)
+
+
+def variant_key(prefix: str, digest: str, name: str, fmt: str) -> str:
+    return f"{prefix}/variants/{digest}/{name}.{'jpg' if fmt == 'jpeg' else fmt}"
+
+
+def render_variants(data: bytes) -> Dict[Tuple[str, str], bytes]:
+    """(variant name, format) -> encoded image for every configured size and format."""
+    with Image.open(BytesIO(data)) as original:
+        # Phone photos are often stored sideways with an EXIF rotation flag
+        image = ImageOps.exif_transpose(original)
+        image.load()
+
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    image = image.convert("RGBA" if has_alpha else "RGB")
+
+    rendered = {}
+    for name, size in VARIANT_SIZES:
+        resized = image.copy()
+        resized.thumbnail((size, size), Image.Resampling.LANCZOS)
+        for fmt in VARIANT_FORMATS:
+            pil_format, _ = _FORMATS[fmt]
+            frame = resized
+            if pil_format == "JPEG" and frame.mode == "RGBA":
+                # JPEG has no alpha: flatten onto white instead of black
+                frame = Image.new("RGB", resized.size, (255, 255, 255))
+                frame.paste(resized, mask=resized.getchannel("A"))
+            out = BytesIO()
+            frame.save(out, pil_format, quality=IMAGE_VARIANT_QUALITY, optimize=True)
+            rendered[(name, fmt)] = out.getvalue()
+    return rendered
+
+
+def build_variants(backend: StorageBackend, data: bytes, prefix: str) -> Dict[str, Dict[str, str]]:
+    """Stores the variants of `data` (rendering only if some are missing) and returns their URLs. Blocking."""
+    digest = hashlib.sha256(data).hexdigest()
+    keys = {(name, fmt): variant_key(prefix, digest, name, fmt) for name, _ in VARIANT_SIZES for fmt in VARIANT_FORMATS}
+
+    missing = [pair for pair, key in keys.items() if not backend.exists(key)]
+    if missing:
+        rendered = render_variants(data)
+        for pair in missing:
+            _, content_type = _FORMATS[pair[1]]
+            backend.save(keys[pair], BytesIO(rendered[pair]), content_type)
+
+    variants: Dict[str, Dict[str, str]] = {}
+    for (name, fmt), key in keys.items():
+        variants.setdefault(name, {})[fmt] = backend.public_url(key)
+    return variants
+
+
+def _generate_image_variants(model, entity_id: int, image_url: str, data: bytes, prefix: str):
+    backend = get_storage()
+    if backend is None or not VARIANT_SIZES or not VARIANT_FORMATS:
+        return
+    try:
+        variants = build_variants(backend, data, prefix)
+    except Image.UnidentifiedImageError:
+        logger.warning("Upload for %s %s is not a readable image; no variants made", model.__tablename__, entity_id)
+        return
+    except Exception:
+        logger.exception("Could not build image variants for %s %s", model.__tablename__, entity_id)
+        return
+
+    with SessionLocal() as db:
+        # Only if the row still shows this upload; a newer one brings its own variants
+        db.query(model).filter(model.id == entity_id, model.image_url == image_url).update(
+            {model.image_variants: variants}, synchronize_session=False
+        )
+        db.commit()
+    logger.debug("Stored %d image variants for %s %s", len(variants), model.__tablename__, entity_id)
+
+
+def _run_image_variants(*args):
+    try:
+        _generate_image_variants(*args)
+    finally:
+        _backlog.release()
+
+
+def schedule_image_variants(model, entity_id: int, image_url: str, data: bytes, prefix: str):
+    """Queues variant generation for a freshly committed upload; returns immediately."""
+    if not _backlog.acquire(blocking=False):
+        IMAGE_VARIANTS_SKIPPED.inc()
+        logger.warning("Image variant backlog full (%d); no variants for %s %s",
+                       IMAGE_VARIANT_BACKLOG, model.__tablename__, entity_id)
+        return
+    try:
+        _executor.submit(_run_image_variants, model, entity_id, image_url, data, prefix)
+    except RuntimeError:
+        # Executor already shut down (interpreter exit)
+        _backlog.release()
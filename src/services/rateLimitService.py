@@ -0,0 +1,160 @@
+from fastapi import HTTPException, Request, status
+from prometheus_client import Counter
+from redis.exceptions import RedisError
+from jose import jwt, JWTError
+from cachetools import LRUCache
+from typing import Dict, NamedTuple, Tuple
+import logging, math, os, time
+
+import cache.redis_client as redis_cache
+from .authService import SECRET_KEY, ALGORITHM
+
+logger = logging.getLogger(__name__)
+
+
+# ==========================================================
+# 🔹 Token-bucket rate limiting
+#
+# Each (limit, principal) pair has a bucket holding up to `requests` tokens that
+# refills at requests/seconds per second. A request takes one token or gets a
+# 429 with Retry-After. The principal is the `sub` of a valid bearer token,
+# otherwise the client IP. The bucket lives in Redis, updated by one Lua call
+# (one round trip), so all workers share it. When Redis is unavailable each
+# worker falls back to its own in-memory buckets, which are per process and so
+# looser, instead of failing open or closed.
+#   RATE_LIMITS                 overrides, e.g. "login=5/60,search=300/60"
+#   RATE_LIMIT_ENABLED          0 turns every limit off (load tests)
+#   RATE_LIMIT_TRUST_FORWARDED  1 behind a proxy: use the first X-Forwarded-For address
+
+class RateLimit(NamedTuple):
+    requests: int
+    seconds: float
+
+
+DEFAULT_RATE_LIMITS: Dict[str, RateLimit] = {
+    # bcrypt makes every attempt expensive, and it is the brute force target
+    "login": RateLimit(10, 60),
+    "order_create": RateLimit(20, 60),
+    "search": RateLimit(120, 60),
+}
+
+
+def _parse_rate_limits(value: str) -> Dict[str, RateLimit]:
+    limits = {}
+    for part in value.split(","):
+        name, _, spec = part.partition("=")
+        requests, _, seconds = spec.partition("/")
+        if name.strip() and requests.strip() and seconds.strip():
+            limits[name.strip()] = RateLimit(int(requests), float(seconds))
+    return limits
+
+
+RATE_LIMITS = {**DEFAULT_RATE_LIMITS, **_parse_rate_limits(os.environ.get('RATE_LIMITS', ''))}
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1') != '0'
+RATE_LIMIT_TRUST_FORWARDED = os.environ.get('RATE_LIMIT_TRUST_FORWARDED', '0') == '1'
+# Buckets kept per worker by the fallback (least recently used are dropped)
+RATE_LIMIT_LOCAL_MAX_KEYS = int(os.environ.get('RATE_LIMIT_LOCAL_MAX_KEYS', '50000'))
+
+RATE_LIMITED = Counter("rate_limited_requests_total", "Requests rejected with 429 by a rate limit", ["limit"])
+RATE_LIMIT_FALLBACKS = Counter("rate_limit_local_fallback_total", "Rate limit checks answered in-process because Redis failed")
+
+# KEYS[1] = bucket; ARGV = capacity, refill per second
+# Uses the Redis clock so every worker agrees on elapsed time.
+# Returns {allowed, seconds until a token is available} (as a string: Lua numbers would be truncated)
+_TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 't', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed, wait = 0, (1 - tokens) / rate
+if tokens >= 1 then
+  tokens = tokens - 1
+  allowed, wait = 1, 0
+end
+redis.call('HSET', KEYS[1], 't', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(wait)}
+"""
+
+_script = None
+_script_client = None
+_local_buckets: LRUCache = LRUCache(maxsize=RATE_LIMIT_LOCAL_MAX_KEYS)
+_redis_failing = False
+
+
+def _take_local(key: str, limit: RateLimit) -> Tuple[bool, float]:
+    # Same arithmetic as the Lua script; only ever called from the event loop thread
+    capacity, rate = limit.requests, limit.requests / limit.seconds
+    now = time.monotonic()
+    tokens, ts = _local_buckets.get(key, (capacity, now))
+    tokens = min(capacity, tokens + (now - ts) * rate)
+    if tokens >= 1:
+        _local_buckets[key] = (tokens - 1, now)
+        return True, 0.0
+    _local_buckets[key] = (tokens, now)
+    return False, (1 - tokens) / rate
+
+
+async def _take(key: str, limit: RateLimit) -> Tuple[bool, float]:
+    global _script, _script_client, _redis_failing
+    redis_client = redis_cache.redis_client
+    if redis_client is not None:
+        if _script_client is not redis_client:
+            _script, _script_client = redis_client.register_script(_TOKEN_BUCKET_LUA), redis_client
+        try:
+            allowed, wait = await _script(keys=[key], args=[limit.requests, limit.requests / limit.seconds])
+            if _redis_failing:
+                _redis_failing = False
+                logger.info("Rate limiting is back on Redis")
+            return allowed == 1, float(wait)
+        except (RedisError, OSError) as e:
+            if not _redis_failing:
+                _redis_failing = True
+                logger.warning("Redis unavailable for rate limiting, using in-process buckets: %s", e)
+    RATE_LIMIT_FALLBACKS.inc()
+    return _take_local(key, limit)
+
+
+def request_principal(request: Request) -> str:
+    """`sub` of a valid bearer token, else the client address."""
+    authorization = request.headers.get("authorization")
+    if authorization and authorization[:7].lower() == "bearer ":
+        try:
+            subject = jwt.decode(authorization[7:], SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+            if subject:
+                return f"sub:{subject}"
+        except JWTError:
+            pass
+    if RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return f"ip:{forwarded.split(',')[0].strip()}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+def rate_limit(name: str):
+    """
+    Dependency enforcing RATE_LIMITS[name], e.g.
+        @router.post("/token", dependencies=[Depends(rate_limit("login"))])
+    Listed in the route's `dependencies`, it runs before the endpoint's own
+    dependencies, so a rejected request never reaches the database.
+    """
+    limit = RATE_LIMITS[name]
+
+    async def check_rate_limit(request: Request):
+        if not RATE_LIMIT_ENABLED:
+            return
+        allowed, wait = await _take(f"ratelimit:{name}:{request_principal(request)}", limit)
+        if not allowed:
+            RATE_LIMITED.labels(name).inc()
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests, try again later.",
+                headers={"Retry-After": str(max(1, math.ceil(wait)))},
+            )
+
+    return check_rate_limit
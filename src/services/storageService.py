@@ -0,0 +1,191 @@
+from fastapi import HTTPException, UploadFile, status
+from dotenv import load_dotenv
+from typing import BinaryIO, Optional
+import asyncio, hashlib, logging, os, re, tempfile, threading
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+
+# ==========================================================
+# 🔹 Object storage for uploaded images
+#
+# The Google Cloud client is blocking, so uploads never run on the event loop:
+# hashing, the existence check and the transfer all happen in one worker thread
+# (asyncio.to_thread). Objects are named by the SHA-256 of their content, e.g.
+# user_profiles/<sha256>.jpg. Uploading the same photo again finds the object and
+# skips the transfer, and the URL can be cached forever.
+#   STORAGE_BACKEND     gcs (default when GCP_BUCKET_NAME is set) or local
+#   LOCAL_STORAGE_DIR   where the local backend writes; main.py serves it on
+#                       LOCAL_STORAGE_URL so offline setups get working URLs
+
+GCP_PROJECT_ID = os.getenv("GCP_PROJECT_ID")
+GCP_BUCKET_NAME = os.getenv("GCP_BUCKET_NAME")
+GCP_APPLICATION_CREDENTIALS = os.getenv("GCP_APPLICATION_CREDENTIALS")
+
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'gcs' if GCP_BUCKET_NAME else 'local').lower()
+LOCAL_STORAGE_DIR = os.environ.get('LOCAL_STORAGE_DIR', 'media')
+LOCAL_STORAGE_URL = os.environ.get('LOCAL_STORAGE_URL', '/media').rstrip('/')
+STORAGE_MAX_UPLOAD_BYTES = int(os.environ.get('STORAGE_MAX_UPLOAD_BYTES', str(10 * 1024 * 1024)))
+
+# Content-addressed objects never change, so clients and CDNs may keep them forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+_HASH_CHUNK_BYTES = 1024 * 1024
+# Keys this worker already knows exist, so repeat uploads skip even the existence check
+_KNOWN_KEYS_MAX = 10000
+_EXTENSION_PATTERN = re.compile(r"^\.[a-z0-9]{1,8}$")
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class StorageBackend:
+    """What the upload pipeline needs from a bucket; all methods block."""
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def save(self, key: str, data: BinaryIO, content_type: Optional[str]):
+        raise NotImplementedError
+
+    def public_url(self, key: str) -> str:
+        raise NotImplementedError
+
+
+class GCSStorage(StorageBackend):
+
+    def __init__(self, bucket_name: str, project: Optional[str], credentials_file: Optional[str]):
+        from google.cloud import storage
+        from google.oauth2 import service_account
+
+        credentials = service_account.Credentials.from_service_account_file(credentials_file) if credentials_file else None
+        self.bucket = storage.Client(project=project, credentials=credentials).bucket(bucket_name)
+
+    def exists(self, key: str) -> bool:
+        return self.bucket.blob(key).exists()
+
+    def save(self, key: str, data: BinaryIO, content_type: Optional[str]):
+        blob = self.bucket.blob(key)
+        blob.cache_control = IMMUTABLE_CACHE_CONTROL
+        blob.upload_from_file(data, content_type=content_type, rewind=True)
+
+    def public_url(self, key: str) -> str:
+        return self.bucket.blob(key).public_url
+
+
+class LocalStorage(StorageBackend):
+
+    def __init__(self, root: str, base_url: str):
+        self.root = os.path.abspath(root)
+        self.base_url = base_url
+
+    def _path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Storage key escapes the storage directory: {key!r}")
+        return path
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def save(self, key: str, data: BinaryIO, content_type: Optional[str]):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data.seek(0)
+        # Write next to the target and rename, so a reader never sees half a file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while chunk := data.read(_HASH_CHUNK_BYTES):
+                    out.write(chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def public_url(self, key: str) -> str:
+        return f"{self.base_url}/{key}"
+
+
+_backend: Optional[StorageBackend] = None
+_backend_ready = False
+_backend_lock = threading.Lock()
+_known_keys = set()
+
+
+def get_storage() -> Optional[StorageBackend]:
+    """
+    The configured backend, created on first use; None if it cannot be set up.
+    Blocking the first time (credentials, client setup), so call it from a worker
+    thread. A failed setup is remembered rather than retried on every upload.
+    """
+    global _backend, _backend_ready
+    if not _backend_ready:
+        with _backend_lock:
+            if not _backend_ready:
+                try:
+                    if STORAGE_BACKEND == "gcs":
+                        _backend = GCSStorage(GCP_BUCKET_NAME, GCP_PROJECT_ID, GCP_APPLICATION_CREDENTIALS)
+                    else:
+                        _backend = LocalStorage(LOCAL_STORAGE_DIR, LOCAL_STORAGE_URL)
+                except Exception as e:
+                    logger.error("Storage backend %r not initialised, uploads are disabled: %s", STORAGE_BACKEND, e)
+                _backend_ready = True
+    return _backend
+
+
+def content_digest(data: BinaryIO) -> str:
+    data.seek(0)
+    digest, size = hashlib.sha256(), 0
+    while chunk := data.read(_HASH_CHUNK_BYTES):
+        size += len(chunk)
+        if size > STORAGE_MAX_UPLOAD_BYTES:
+            raise UploadTooLarge()
+        digest.update(chunk)
+    data.seek(0)
+    return digest.hexdigest()
+
+
+def store_object(backend: StorageBackend, data: BinaryIO, prefix: str, extension: str,
+                 content_type: Optional[str]) -> str:
+    """Uploads `data` under its content hash unless it is already there; returns the key. Blocking."""
+    key = f"{prefix}/{content_digest(data)}{extension}"
+    if key not in _known_keys and not backend.exists(key):
+        backend.save(key, data, content_type)
+    else:
+        logger.debug("Object %s already stored, skipping upload", key)
+    if len(_known_keys) >= _KNOWN_KEYS_MAX:
+        _known_keys.clear()
+    _known_keys.add(key)
+    return key
+
+
+def _store_upload(data: BinaryIO, prefix: str, extension: str, content_type: Optional[str]) -> Optional[str]:
+    backend = get_storage()
+    if backend is None:
+        return None
+    return backend.public_url(store_object(backend, data, prefix, extension, content_type))
+
+
+async def store_upload(upload: UploadFile, prefix: str) -> str:
+    """
+    Stores an uploaded file off the event loop and returns its public URL.
+
+    Raises 500 when storage is not configured and 413 above STORAGE_MAX_UPLOAD_BYTES.
+    """
+    extension = os.path.splitext(upload.filename or "")[1].lower()
+    if not _EXTENSION_PATTERN.match(extension):
+        extension = ""
+    try:
+        # Backend setup (first upload only) happens in the same worker thread
+        url = await asyncio.to_thread(_store_upload, upload.file, prefix, extension, upload.content_type)
+    except UploadTooLarge:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Image is larger than {STORAGE_MAX_UPLOAD_BYTES // 1024} KB.",
+        )
+    if url is None:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Cloud Storage not configured.")
+    return url
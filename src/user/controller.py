@@ -1,14 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, Form, File, UploadFile
 from typing import Optional
-import os, uuid
+import logging
 from sqlalchemy.orm import Session 
 
-from google.oauth2 import service_account
-from google.cloud import storage
-
 from database.core import get_db
 from .service import get_current_user
 from services.authService import get_password_hash
+from services.storageService import store_upload
+from services.imageService import schedule_image_variants
 from models.r_schema import (UserCreate, User)
 from models.r_model import (User as UserModel)
 
@@ -21,25 +20,14 @@ router = APIRouter(
 from dotenv import load_dotenv
 
 load_dotenv()
-GCP_PROJECT_ID = os.getenv("GCP_PROJECT_ID")
-GCP_BUCKET_NAME = os.getenv("GCP_BUCKET_NAME")
-GCP_APPLICATION_CREDENTIALS = os.getenv("GCP_APPLICATION_CREDENTIALS")
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix='/user',
     tags=['user']
 )
 
-# --- Google Cloud Storage Setup (copy from restaurant/controller.py) ---
-try:
-    credentials = service_account.Credentials.from_service_account_file(GCP_APPLICATION_CREDENTIALS)
-    storage_client = storage.Client(project=GCP_PROJECT_ID, credentials=credentials)
-    bucket = storage_client.bucket(GCP_BUCKET_NAME)
-except Exception as e:
-    print(f"Error initializing Google Cloud Storage client: {e}")
-    storage_client = None
-    bucket = None
-
 
 @router.post("/register", response_model=User)
 def create_user(user: UserCreate, db: Session = Depends(get_db)):
@@ -85,37 +73,34 @@ async def update_user_details(
 
     if location is not None:
         current_user.location = location
-        # print(f"\n\tUpdated location to: {location}")
 
     if current_location is not None:
         current_user.current_location = current_location
-        print(f"\n\tUpdated current_location to: {current_location}")
 
-    # Handle image upload to GCP
+    # Handle image upload (stored off the event loop, deduplicated by content)
+    variant_source = None
     if image is not None:
         if not image.filename:
             raise HTTPException(status_code=400, detail="Invalid image file.")
-        
-        if not storage_client or not bucket:
-            raise HTTPException(status_code=500, detail="Cloud Storage not configured.")
-        
+
         try:
-            file_ext = os.path.splitext(image.filename)[1]
-            unique_name = f"user_profiles/{uuid.uuid4()}{file_ext}" # Store in a folder
-            blob = bucket.blob(unique_name)
-
-            image.file.seek(0)
-            blob.upload_from_file(image.file, content_type=image.content_type)
-            
-            # Update the user's image_url
-            current_user.image_url = blob.public_url
-        
-        except Exception as e:
-            print(f"Error uploading user image: {e}")
+            image_url = await store_upload(image, "user_profiles")
+            if image_url != current_user.image_url or not current_user.image_variants:
+                current_user.image_url = image_url
+                current_user.image_variants = None
+                await image.seek(0)
+                variant_source = await image.read()
+        except HTTPException:
+            raise
+        except Exception:
+            logger.exception("Could not upload image for user %s", current_user.table_id)
             raise HTTPException(status_code=500, detail="Failed to upload image.")
 
     db.commit()
     db.refresh(current_user)
+
+    if variant_source is not None:
+        schedule_image_variants(UserModel, current_user.id, current_user.image_url, variant_source, "user_profiles")
     
     # We must return the updated user object as a dictionary
     # so it matches the Pydantic 'User' response model